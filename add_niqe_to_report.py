@@ -8,51 +8,199 @@
 import pandas as pd
 import os
 import sys
+import csv
+import functools
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 import pyiqa
 import torch
-from PIL import Image
 import numpy as np
 from tqdm import tqdm
 import cv2
 
+# 尝试导入 Numba（可选，用于加速绿色掩码移除）
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+# OpenCV 4.10+ 支持解码时直接输出RGB
+_IMREAD_COLOR_RGB = getattr(cv2, 'IMREAD_COLOR_RGB', None)
+
+# NIQE批量推理参数：crop尺寸各不相同，等比缩放并居中裁剪到固定分析尺寸后才能堆叠成batch
+NIQE_BATCH_SIZE = 16
+NIQE_INPUT_SIZE = 512
+
+# 断点续算：已算出的分数实时追加到sidecar文件，每隔N条fsync一次
+NIQE_SIDECAR_SUFFIX = '.niqe.part'
+NIQE_FSYNC_EVERY = 100
+
+if NUMBA_AVAILABLE:
+    # 串行内核：crop 已经由加载线程池并行处理，内核内部再开并行会在多个线程
+    # 同时启动并行内核（numba 默认 workqueue 线程层会直接终止进程）
+    @njit(cache=True, fastmath=True)
+    def _strip_green(img, out, threshold):
+        """单次遍历完成阈值判断、减去掩码贡献和截断"""
+        for y in range(img.shape[0]):
+            for x in range(img.shape[1]):
+                b = np.int16(img[y, x, 0])
+                g = np.int16(img[y, x, 1])
+                r = np.int16(img[y, x, 2])
+                out[y, x, 0] = img[y, x, 0]
+                out[y, x, 2] = img[y, x, 2]
+                if g > r + threshold and g > b + threshold:
+                    v = g - 102
+                    out[y, x, 1] = 0 if v < 0 else v
+                else:
+                    out[y, x, 1] = img[y, x, 1]
+
+    # 预热编译一次；编译或写缓存失败时退回 numpy 实现
+    try:
+        _dummy = np.zeros((2, 2, 3), dtype=np.uint8)
+        _strip_green(_dummy, np.empty_like(_dummy), 30)
+    except Exception:
+        NUMBA_AVAILABLE = False
+
+
 def remove_green_mask(img_bgr):
     """
     移除crop图像上的绿色半透明掩码
     掩码是通过 cv2.addWeighted 添加的半透明绿色(0, 255, 0)
 
     Args:
-        img_bgr: BGR格式的图像
+        img_bgr: BGR格式的图像（判断条件对R/B通道对称，RGB图像同样适用）
 
     Returns:
         移除掩码后的BGR图像
     """
     # 检测绿色像素：G通道明显高于R和B
     # 掩码特征：G > R + threshold 且 G > B + threshold
-    img_float = img_bgr.astype(np.float32)
-    b, g, r = cv2.split(img_float)
-
-    # 找到绿色掩码区域（G明显大于R和B）
     threshold = 30
-    green_mask = (g > r + threshold) & (g > b + threshold)
+
+    # 有 Numba 时使用融合内核，一次遍历、无中间数组
+    if NUMBA_AVAILABLE and img_bgr.ndim == 3 and img_bgr.dtype == np.uint8:
+        result = np.empty_like(img_bgr)
+        _strip_green(img_bgr, result, threshold)
+        return result
+
+    # 直接使用通道视图，用int16比较，避免cv2.split和float32整图拷贝
+    g = img_bgr[..., 1].astype(np.int16)
+    green_mask = (g - img_bgr[..., 2] > threshold) & (g - img_bgr[..., 0] > threshold)
 
     # 对于绿色掩码区域，估算原始颜色
     # 由于掩码是用addWeighted(img, 1.0, green, 0.4, 0)添加的
     # 所以 result = img * 1.0 + green * 0.4
     # 我们可以反推: img ≈ (result - green * 0.4) / 1.0
+    # green_contribution = (0, 255, 0) * 0.4 = (0, 102, 0)
     result = img_bgr.copy()
-
-    if np.any(green_mask):
-        # 估算绿色掩码的贡献并移除
-        # green_contribution = (0, 255, 0) * 0.4 = (0, 102, 0)
-        result[green_mask, 1] = np.clip(
-            result[green_mask, 1] - 102,  # 移除绿色通道的掩码贡献
-            0, 255
-        )
+    np.subtract(g, 102, out=g, where=green_mask)
+    np.clip(g, 0, 255, out=g)
+    result[..., 1] = g
 
     return result
 
 
+def _resize_center_crop(img, size):
+    """
+    等比例缩放使短边等于size，再居中裁剪为 size x size
+
+    NIQE 统计的是局部结构特征，拉伸变形会改变分数；不用补边，避免纯色填充区影响统计
+    """
+    h, w = img.shape[:2]
+    scale = size / min(h, w)
+    new_w = max(size, int(round(w * scale)))
+    new_h = max(size, int(round(h * scale)))
+    resized = cv2.resize(img, (new_w, new_h), interpolation=cv2.INTER_AREA)
+    top = (new_h - size) // 2
+    left = (new_w - size) // 2
+    return resized[top:top + size, left:left + size]
+
+
+def _load_crop(crop_path):
+    """
+    加载并预处理单张crop（在线程池中执行）
+
+    Returns:
+        (crop_rgb, error): 成功时crop_rgb为缩放后的RGB图像，失败时为None
+    """
+    try:
+        if _IMREAD_COLOR_RGB is not None:
+            # OpenCV 4.10+ 解码时直接输出RGB
+            # 绿色掩码判断对R/B通道对称，可以直接在RGB图像上移除
+            crop_img = cv2.imread(crop_path, _IMREAD_COLOR_RGB)
+        else:
+            crop_img = cv2.imread(crop_path)
+        if crop_img is None:
+            return None, None
+
+        # 移除绿色掩码并缩放到统一分析尺寸
+        crop_clean = remove_green_mask(crop_img)
+        crop_resized = _resize_center_crop(crop_clean, NIQE_INPUT_SIZE)
+        if _IMREAD_COLOR_RGB is None:
+            # BGR -> RGB 只取视图，由 np.stack 组batch时一并拷贝，不单独做一次cvtColor
+            crop_resized = crop_resized[..., ::-1]
+        return crop_resized, None
+    except Exception as e:
+        return None, e
+
+
+def _iter_loaded_crops(crop_paths, max_workers):
+    """
+    按原顺序产出预处理后的crop，后台线程提前加载（预取窗口有限，避免一次性占满内存）
+    """
+    prefetch = max_workers * 2
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending = deque()
+        for crop_path in crop_paths:
+            pending.append(executor.submit(_load_crop, crop_path))
+            if len(pending) >= prefetch:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def _load_niqe_checkpoint(sidecar_path):
+    """读取上次中断时已计算的NIQE分数 {文件名: 分数字符串}"""
+    done = {}
+    if not os.path.exists(sidecar_path):
+        return done
+    with open(sidecar_path, newline='', encoding='utf-8') as f:
+        for row in csv.reader(f):
+            if len(row) == 2:
+                done[row[0]] = row[1]
+    return done
+
+
+@functools.lru_cache(maxsize=2)
+def _get_niqe_model(device_str):
+    """创建NIQE模型（按设备缓存，同一进程内多次调用不重复加载统计参数）"""
+    return pyiqa.create_metric('niqe', device=torch.device(device_str), as_loss=False)
+
+
+def _score_niqe_batch(niqe_model, crops_rgb, device):
+    """
+    批量计算NIQE评分
+
+    Args:
+        niqe_model: pyiqa NIQE模型
+        crops_rgb: 相同尺寸的RGB图像列表 (H, W, 3) uint8
+        device: 模型所在设备
+
+    Returns:
+        与输入顺序一致的NIQE分数列表
+    """
+    batch = torch.from_numpy(np.stack(crops_rgb))
+    if device.type == 'cuda':
+        # 页锁定内存 + 异步拷贝，先传uint8再在GPU上转换，传输量为float的1/4
+        batch = batch.pin_memory().to(device, non_blocking=True)
+    batch = batch.permute(0, 3, 1, 2).float().div_(255.0)
+    with torch.no_grad():
+        scores = niqe_model(batch)
+    return [float(score) for score in scores.flatten().tolist()]
+
+
 def calculate_niqe_for_report(report_csv_path, crop_dir):
     """
     为report.csv中的每张照片计算NIQE评分
@@ -71,105 +219,123 @@ def calculate_niqe_for_report(report_csv_path, crop_dir):
         print(f"❌ 报告文件不存在: {report_csv_path}")
         return
 
-    # 读取CSV
+    # 读取CSV（计算阶段只需要文件名和是否有鸟两列，完整报告在最后写回时再读取）
     print(f"📂 读取报告: {report_csv_path}")
-    df = pd.read_csv(report_csv_path)
-    print(f"   总记录数: {len(df)}")
-
-    # 检查是否已有NIQE列
-    if 'NIQE技术' in df.columns:
-        print("⚠️  报告中已存在NIQE列，将覆盖")
-        df = df.drop(columns=['NIQE技术'])
+    keys = pd.read_csv(report_csv_path, usecols=['文件名', '是否有鸟'],
+                       dtype={'文件名': 'string', '是否有鸟': 'category'})
+    print(f"   总记录数: {len(keys)}")
 
     # 初始化NIQE模型
     print("\n🤖 初始化NIQE模型...")
-    # NIQE需要float64，MPS不支持，强制使用CPU
-    device = torch.device('cpu')
-    print(f"   设备: {device} (NIQE需要float64，MPS不支持)")
+    # NIQE需要float64：MPS不支持，有CUDA时用CUDA，否则使用CPU
+    device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
+    print(f"   设备: {device} (NIQE需要float64，不使用MPS)")
 
-    niqe_model = pyiqa.create_metric('niqe', device=device, as_loss=False)
+    niqe_model = _get_niqe_model(str(device))
     print("   ✅ NIQE模型加载完成")
 
     # 为每张照片计算NIQE
     print(f"\n📊 计算NIQE评分 (移除掩码后的crop图像)...")
     print(f"   Crop目录: {crop_dir}")
 
-    niqe_scores = []
+    niqe_scores = ['-'] * len(keys)
     success_count = 0
     failed_count = 0
     no_bird_count = 0
     no_crop_count = 0
 
-    for idx, row in tqdm(df.iterrows(), total=len(df), desc="处理照片"):
-        filename = row['文件名']
-        has_bird = row['是否有鸟']
-
-        # 只对有鸟的照片计算NIQE
-        if has_bird != '是':
-            niqe_scores.append('-')
-            no_bird_count += 1
-            continue
-
+    # 断点续算：读取上次中断前已写入sidecar的分数
+    sidecar_path = report_csv_path + NIQE_SIDECAR_SUFFIX
+    done_scores = _load_niqe_checkpoint(sidecar_path)
+    if done_scores:
+        print(f"   ♻️  从断点恢复 {len(done_scores)} 条已计算的NIQE分数")
+    sidecar_file = open(sidecar_path, 'a', newline='', encoding='utf-8')
+    sidecar_writer = csv.writer(sidecar_file)
+    unsynced_rows = 0
+
+    # 待推理的batch：(行位置, 文件名) + 预处理后的crop
+    batch_entries = []
+    batch_crops = []
+
+    def flush_batch():
+        nonlocal success_count, failed_count, unsynced_rows
+        if not batch_crops:
+            return
+        try:
+            scores = _score_niqe_batch(niqe_model, batch_crops, device)
+            # NIQE分数：越低越好（无固定范围，通常0-100）
+            for (pos, filename), score in zip(batch_entries, scores):
+                niqe_scores[pos] = f"{score:.2f}"
+                sidecar_writer.writerow((filename, niqe_scores[pos]))
+            success_count += len(scores)
+            unsynced_rows += len(scores)
+            if unsynced_rows >= NIQE_FSYNC_EVERY:
+                sidecar_file.flush()
+                os.fsync(sidecar_file.fileno())
+                unsynced_rows = 0
+        except Exception as e:
+            failed_count += len(batch_crops)
+            print(f"\n   ⚠️  批量计算失败 ({len(batch_crops)} 张): {e}")
+        batch_entries.clear()
+        batch_crops.clear()
+
+    # 只对有鸟的照片计算NIQE：用布尔掩码一次筛出，只遍历有鸟的行
+    is_bird = (keys['是否有鸟'] == '是').to_numpy(dtype=bool)
+    no_bird_count = int(len(is_bird) - is_bird.sum())
+    bird_positions = np.flatnonzero(is_bird)
+    bird_filenames = keys['文件名'].to_numpy()[bird_positions]
+
+    # 先筛选出需要计算的行，再由线程池并行加载crop
+    tasks = []  # [(行位置, 文件名, crop路径), ...]
+    for pos, filename in zip(bird_positions.tolist(), bird_filenames):
         # 查找crop图像
         crop_path = os.path.join(crop_dir, f"Crop_{filename}.jpg")
         if not os.path.exists(crop_path):
-            niqe_scores.append('-')
             no_crop_count += 1
             continue
 
-        # 计算NIQE
-        try:
-            # 加载crop图像(BGR格式)
-            crop_img_bgr = cv2.imread(crop_path)
-            if crop_img_bgr is None:
-                niqe_scores.append('-')
-                failed_count += 1
-                continue
-
-            # 移除绿色掩码
-            crop_clean = remove_green_mask(crop_img_bgr)
-
-            # 转换为RGB
-            crop_rgb = cv2.cvtColor(crop_clean, cv2.COLOR_BGR2RGB)
-
-            # 转换为PIL Image（pyiqa需要）
-            crop_pil = Image.fromarray(crop_rgb)
+        # 上次已算出的直接复用
+        if str(filename) in done_scores:
+            niqe_scores[pos] = done_scores[str(filename)]
+            success_count += 1
+            continue
 
-            # 计算NIQE
-            with torch.no_grad():
-                score = niqe_model(crop_pil)
+        tasks.append((pos, filename, crop_path))
 
-            # 转换为Python float
-            if isinstance(score, torch.Tensor):
-                score = score.item()
+    try:
+        loaded = _iter_loaded_crops([task[2] for task in tasks], max_workers=os.cpu_count() or 1)
+        for (pos, filename, _), (crop_rgb, error) in tqdm(zip(tasks, loaded), total=len(tasks), desc="处理照片"):
+            if crop_rgb is None:
+                failed_count += 1
+                if error is not None and failed_count <= 5:  # 只打印前5个错误
+                    print(f"\n   ⚠️  {filename} 计算失败: {error}")
+                continue
 
-            # NIQE分数：越低越好（无固定范围，通常0-100）
-            score = float(score)
-            niqe_scores.append(f"{score:.2f}")
-            success_count += 1
+            batch_entries.append((pos, filename))
+            batch_crops.append(crop_rgb)
+            if len(batch_crops) >= NIQE_BATCH_SIZE:
+                flush_batch()
 
-        except Exception as e:
-            niqe_scores.append('-')
-            failed_count += 1
-            if failed_count <= 5:  # 只打印前5个错误
-                print(f"\n   ⚠️  {filename} 计算失败: {e}")
+        flush_batch()
+    finally:
+        sidecar_file.flush()
+        os.fsync(sidecar_file.fileno())
+        sidecar_file.close()
 
-    # 添加NIQE列到DataFrame
-    df['NIQE技术'] = niqe_scores
-
-    # 重新排列列顺序（NIQE放在BRISQUE后面）
+    # 读取完整报告，添加NIQE列（原地插入到BRISQUE后面，避免重排列时整表拷贝）
+    df = pd.read_csv(report_csv_path)
+    if 'NIQE技术' in df.columns:
+        print("⚠️  报告中已存在NIQE列，将覆盖")
+        df.drop(columns=['NIQE技术'], inplace=True)
     if 'BRISQUE技术' in df.columns:
-        cols = df.columns.tolist()
-        # 找到BRISQUE的位置
-        brisque_idx = cols.index('BRISQUE技术')
-        # 移除NIQE（在末尾）
-        cols.remove('NIQE技术')
-        # 插入到BRISQUE后面
-        cols.insert(brisque_idx + 1, 'NIQE技术')
-        df = df[cols]
-
-    # 保存更新后的CSV
+        niqe_col_idx = df.columns.get_loc('BRISQUE技术') + 1
+    else:
+        niqe_col_idx = len(df.columns)
+    df.insert(niqe_col_idx, 'NIQE技术', niqe_scores)
+
+    # 保存更新后的CSV，合并完成后删除断点文件
     df.to_csv(report_csv_path, index=False, encoding='utf-8-sig')
+    os.remove(sidecar_path)
 
     print("\n" + "=" * 80)
     print("📊 统计结果")
@@ -7,9 +7,42 @@ SuperPicky V3.1 - 高级配置管理
 
 import json
 import os
+from dataclasses import dataclass, fields
 from pathlib import Path
 
 
+@dataclass(frozen=True, slots=True)
+class AdvancedConfigSnapshot:
+    """高级配置的只读快照（处理过程中热路径按属性直接读取，无需字典查找）"""
+    min_confidence: float
+    min_sharpness: int
+    min_nima: float
+    max_brisque: int
+    picked_top_percentage: int
+    save_csv: bool
+    log_level: str
+    language: str
+
+
+_SNAPSHOT_FIELDS = tuple(f.name for f in fields(AdvancedConfigSnapshot))
+
+# 已解析的配置文件缓存 {绝对路径: (mtime, 配置字典)}，文件未修改时不再重复解析JSON
+_file_cache = {}
+
+
+def _read_config_file(config_file):
+    """读取配置文件（按修改时间缓存）"""
+    path = os.path.abspath(config_file)
+    mtime = os.path.getmtime(path)
+    cached = _file_cache.get(path)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+    with open(path, 'r', encoding='utf-8') as f:
+        loaded_config = json.load(f)
+    _file_cache[path] = (mtime, loaded_config)
+    return loaded_config
+
+
 class AdvancedConfig:
     """高级配置类 - 管理所有硬编码参数"""
 
@@ -36,16 +69,23 @@ class AdvancedConfig:
         """初始化配置"""
         self.config_file = config_file
         self.config = self.DEFAULT_CONFIG.copy()
+        self._frozen = None
+        self._mtime = None  # 已加载配置文件的修改时间
         self.load()
+        self._refresh()
 
     def load(self):
-        """从文件加载配置"""
+        """从文件加载配置（文件自上次加载后未修改时直接返回）"""
         if os.path.exists(self.config_file):
             try:
-                with open(self.config_file, 'r', encoding='utf-8') as f:
-                    loaded_config = json.load(f)
-                    # 合并配置（保留默认值中有但加载配置中没有的项）
-                    self.config.update(loaded_config)
+                mtime = os.path.getmtime(self.config_file)
+                if mtime == self._mtime:
+                    return
+                loaded_config = _read_config_file(self.config_file)
+                # 合并配置（保留默认值中有但加载配置中没有的项）
+                self.config.update(loaded_config)
+                self._mtime = mtime
+                self._refresh()
                 print(f"✅ 已加载高级配置: {self.config_file}")
             except Exception as e:
                 print(f"⚠️  加载配置失败，使用默认值: {e}")
@@ -55,6 +95,9 @@ class AdvancedConfig:
         try:
             with open(self.config_file, 'w', encoding='utf-8') as f:
                 json.dump(self.config, f, indent=2, ensure_ascii=False)
+            # 内存中的配置即为文件内容，记录修改时间避免下次load重复解析
+            self._mtime = os.path.getmtime(self.config_file)
+            _file_cache[os.path.abspath(self.config_file)] = (self._mtime, self.config.copy())
             print(f"✅ 已保存高级配置: {self.config_file}")
             return True
         except Exception as e:
@@ -64,74 +107,92 @@ class AdvancedConfig:
     def reset_to_default(self):
         """重置为默认配置"""
         self.config = self.DEFAULT_CONFIG.copy()
+        self._mtime = None  # 之后调用load()需重新应用文件中的配置
+        self._refresh()
+
+    def _refresh(self):
+        """根据当前配置字典重建只读快照（配置变更后调用）"""
+        self._frozen = AdvancedConfigSnapshot(**{name: self.config[name] for name in _SNAPSHOT_FIELDS})
+
+    def snapshot(self):
+        """获取当前配置的只读快照（处理开始时获取一次，整个批次内保持一致）"""
+        return self._frozen
 
     # Getter方法
     @property
     def min_confidence(self):
-        return self.config["min_confidence"]
+        return self._frozen.min_confidence
 
     @property
     def min_sharpness(self):
-        return self.config["min_sharpness"]
+        return self._frozen.min_sharpness
 
     @property
     def min_nima(self):
-        return self.config["min_nima"]
+        return self._frozen.min_nima
 
     @property
     def max_brisque(self):
-        return self.config["max_brisque"]
+        return self._frozen.max_brisque
 
     @property
     def picked_top_percentage(self):
-        return self.config["picked_top_percentage"]
+        return self._frozen.picked_top_percentage
 
     @property
     def save_csv(self):
-        return self.config["save_csv"]
+        return self._frozen.save_csv
 
     @property
     def log_level(self):
-        return self.config["log_level"]
+        return self._frozen.log_level
 
     @property
     def language(self):
-        return self.config["language"]
+        return self._frozen.language
 
     # Setter方法
     def set_min_confidence(self, value):
         """设置AI置信度阈值 (0.3-0.7)"""
         self.config["min_confidence"] = max(0.3, min(0.7, float(value)))
+        self._refresh()
 
     def set_min_sharpness(self, value):
         """设置锐度最低阈值 (2000-6000)"""
         self.config["min_sharpness"] = max(2000, min(6000, int(value)))
+        self._refresh()
 
     def set_min_nima(self, value):
         """设置美学最低阈值 (3.0-5.0)"""
         self.config["min_nima"] = max(3.0, min(5.0, float(value)))
+        self._refresh()
 
     def set_max_brisque(self, value):
         """设置噪点最高阈值 (20-50)"""
         self.config["max_brisque"] = max(20, min(50, int(value)))
+        self._refresh()
 
     def set_picked_top_percentage(self, value):
         """设置精选旗标Top百分比 (10-50)"""
         self.config["picked_top_percentage"] = max(10, min(50, int(value)))
+        self._refresh()
 
     def set_save_csv(self, value):
         """设置是否保存CSV"""
         self.config["save_csv"] = bool(value)
+        self._refresh()
 
     def set_log_level(self, value):
         """设置日志详细程度"""
         if value in ["simple", "detailed"]:
             self.config["log_level"] = value
+            self._refresh()
 
     def set_language(self, value):
         """设置语言"""
         if value in ["zh_CN", "en_US"]:
             self.config["language"] = value
+            self._refresh()
 
     def get_dict(self):
         """获取配置字典（用于传递给其他模块）"""
@@ -5,10 +5,42 @@ SuperPicky V3.1 - 高级设置对话框
 """
 
 import tkinter as tk
-from tkinter import ttk, messagebox
+from tkinter import ttk, messagebox, font as tkfont
 from advanced_config import get_advanced_config
 
 
+# 滑块设置项（声明式定义，导入时构建一次；键与 _create_slider_setting 参数一致）
+RATING_SLIDERS = (
+    # AI置信度阈值
+    dict(key="min_confidence", label="AI置信度最低阈值:",
+         description="低于此值将被判定为0星（技术质量差）",
+         from_=0.3, to=0.7, resolution=0.05, default=0.5,
+         format_func=lambda v: f"{v:.2f} ({int(v*100)}%)"),
+    # 锐度最低阈值
+    dict(key="min_sharpness", label="锐度最低阈值:",
+         description="低于此值将被判定为0星（技术质量差）",
+         from_=2000, to=6000, resolution=100, default=4000,
+         format_func=lambda v: f"{int(v)}"),
+    # 美学最低阈值
+    dict(key="min_nima", label="摄影美学最低阈值:",
+         description="低于此值将被判定为0星（技术质量差）",
+         from_=3.0, to=5.0, resolution=0.1, default=4.0,
+         format_func=lambda v: f"{v:.1f}"),
+    # 噪点最高阈值
+    dict(key="max_brisque", label="画面噪点最高阈值:",
+         description="高于此值将被判定为0星（技术质量差）",
+         from_=20, to=50, resolution=1, default=30,
+         format_func=lambda v: f"{int(v)}"),
+)
+
+OUTPUT_SLIDERS = (
+    dict(key="picked_top_percentage", label="精选旗标Top百分比:",
+         description="3星照片中，美学+锐度双排名都在此百分比内的设为精选",
+         from_=10, to=50, resolution=5, default=25,
+         format_func=lambda v: f"{int(v)}%"),
+)
+
+
 class AdvancedSettingsDialog:
     """高级设置对话框"""
 
@@ -30,6 +62,10 @@ class AdvancedSettingsDialog:
         self.dialog.transient(self.parent)
         self.dialog.grab_set()
 
+        # 滑块项共用的字体（每个控件传元组会各自创建字体对象）
+        self._desc_font = tkfont.Font(self.dialog, family="Arial", size=9)
+        self._value_font = tkfont.Font(self.dialog, family="Arial", size=10, weight="bold")
+
         # 创建Notebook（选项卡）
         notebook = ttk.Notebook(self.dialog)
         notebook.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
@@ -57,49 +93,8 @@ class AdvancedSettingsDialog:
                         font=("Arial", 10), foreground="#666")
         desc.pack(pady=(0, 15))
 
-        # AI置信度阈值
-        self._create_slider_setting(
-            parent,
-            key="min_confidence",
-            label="AI置信度最低阈值:",
-            description="低于此值将被判定为0星（技术质量差）",
-            from_=0.3, to=0.7, resolution=0.05,
-            default=0.5,
-            format_func=lambda v: f"{v:.2f} ({int(v*100)}%)"
-        )
-
-        # 锐度最低阈值
-        self._create_slider_setting(
-            parent,
-            key="min_sharpness",
-            label="锐度最低阈值:",
-            description="低于此值将被判定为0星（技术质量差）",
-            from_=2000, to=6000, resolution=100,
-            default=4000,
-            format_func=lambda v: f"{int(v)}"
-        )
-
-        # 美学最低阈值
-        self._create_slider_setting(
-            parent,
-            key="min_nima",
-            label="摄影美学最低阈值:",
-            description="低于此值将被判定为0星（技术质量差）",
-            from_=3.0, to=5.0, resolution=0.1,
-            default=4.0,
-            format_func=lambda v: f"{v:.1f}"
-        )
-
-        # 噪点最高阈值
-        self._create_slider_setting(
-            parent,
-            key="max_brisque",
-            label="画面噪点最高阈值:",
-            description="高于此值将被判定为0星（技术质量差）",
-            from_=20, to=50, resolution=1,
-            default=30,
-            format_func=lambda v: f"{int(v)}"
-        )
+        for spec in RATING_SLIDERS:
+            self._create_slider_setting(parent, **spec)
 
     def _create_output_tab(self, parent):
         """创建输出设置选项卡"""
@@ -109,15 +104,8 @@ class AdvancedSettingsDialog:
         desc.pack(pady=(0, 15))
 
         # 精选旗标Top百分比
-        self._create_slider_setting(
-            parent,
-            key="picked_top_percentage",
-            label="精选旗标Top百分比:",
-            description="3星照片中，美学+锐度双排名都在此百分比内的设为精选",
-            from_=10, to=50, resolution=5,
-            default=25,
-            format_func=lambda v: f"{int(v)}%"
-        )
+        for spec in OUTPUT_SLIDERS:
+            self._create_slider_setting(parent, **spec)
 
         # CSV报告
         csv_frame = ttk.LabelFrame(parent, text="CSV报告", padding=10)
@@ -152,7 +140,7 @@ class AdvancedSettingsDialog:
         frame.pack(fill=tk.X, pady=5)
 
         # 描述文字
-        ttk.Label(frame, text=description, font=("Arial", 9),
+        ttk.Label(frame, text=description, font=self._desc_font,
                  foreground="#888").pack(anchor=tk.W)
 
         # 滑块和值显示
@@ -166,13 +154,22 @@ class AdvancedSettingsDialog:
         slider.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=(0, 10))
 
         value_label = ttk.Label(slider_frame, text=format_func(default),
-                               width=12, font=("Arial", 10, "bold"))
+                               width=12, font=self._value_font)
         value_label.pack(side=tk.LEFT)
 
-        # 更新标签的回调
-        def update_label(*args):
+        # 更新标签的回调（拖动时每个像素都会触发写事件，合并到空闲时每轮最多刷新一次）
+        pending = [False]
+
+        def refresh_label():
+            pending[0] = False
             value_label.configure(text=format_func(self.vars[key].get()))
 
+        def update_label(*args):
+            if pending[0]:
+                return
+            pending[0] = True
+            self.dialog.after_idle(refresh_label)
+
         self.vars[key].trace_add('write', update_label)
 
     def _create_buttons(self):
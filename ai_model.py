@@ -1,51 +1,114 @@
 import os
 import time
+import threading
+import functools
+from concurrent.futures import ThreadPoolExecutor
 import cv2
 import numpy as np
+import torch
+import torch.nn.functional as F
 from ultralytics import YOLO
 from utils import log_message, write_to_csv
 from config import config
 from sharpness import MaskBasedSharpnessCalculator
 from iqa_scorer import get_iqa_scorer
 from advanced_config import get_advanced_config
+from image_decode import preprocess_image
 
 # 禁用 Ultralytics 设置警告
 os.environ['YOLO_VERBOSE'] = 'False'
 
+# OpenCV：启用优化代码路径（SIMD/IPP），内部线程数取一半核心，
+# 给批内并行的预处理/后处理线程留出余量，避免过度订阅
+cv2.setUseOptimized(True)
+cv2.setNumThreads(max(2, (os.cpu_count() or 2) // 2))
 
+# 推理锁：YOLO predictor 与 IQA 模型不可重入，多线程并行处理时串行化GPU推理，
+# 图像解码、锐度计算、CSV写入等CPU步骤仍可并行
+_inference_lock = threading.Lock()
+
+# 批量推理：每次YOLO调用处理的图片数（见 config.ai.BATCH_SIZE），以及批内并行预处理/后处理的线程数
+BATCH_SIZE = config.ai.BATCH_SIZE
+PREPROCESS_WORKERS = 4
+POSTPROCESS_WORKERS = min(4, os.cpu_count() or 1)
+
+# 完整检测的推理参数。ultralytics 会把每次调用的参数合并进常驻 predictor，
+# 预筛用过的 imgsz/classes 会沿用到下一次调用，所以完整检测每次都显式传入
+INFERENCE_SIZE = 640
+_FULL_PREDICT_ARGS = {'imgsz': INFERENCE_SIZE, 'classes': None}
+
+# 裁剪图（调试用）JPEG编码质量，以及掩码可视化的绿色叠加量（0.4*255）
+CROP_JPEG_QUALITY = 85
+_GREEN_TINT = (0, 102, 0, 0)
+
+# JPG扩展名集合（来自配置，预先包含大小写两种形式），常见情况下无需逐张 lower()
+_JPG_EXTS = frozenset(config.file.JPG_EXTENSIONS) | frozenset(
+    ext.upper() for ext in config.file.JPG_EXTENSIONS)
+
+
+@functools.lru_cache(maxsize=1)
 def load_yolo_model():
-    """加载 YOLO 模型（启用MPS GPU加速）"""
+    """
+    加载 YOLO 模型（启用MPS GPU加速）
+
+    进程内只加载一次：GUI中多次点击"开始处理"或其他调用方都复用同一个模型实例
+    """
     model_path = config.ai.get_model_path()
     model = YOLO(str(model_path))
 
     # 尝试使用 Apple MPS (Metal Performance Shaders) GPU 加速
+    # 推理设备在加载时解析一次，逐批推理直接使用，不再每次先试MPS
+    model._device = 'cpu'
     try:
-        import torch
         if torch.backends.mps.is_available():
             print("✅ 检测到 Apple GPU (MPS)，启用硬件加速")
             # YOLO模型会自动识别device参数
             # 注意：不需要手动 model.to('mps')，YOLO会在推理时自动处理
+            model._device = 'mps'
         else:
             print("⚠️  MPS不可用，使用CPU推理")
     except Exception as e:
         print(f"⚠️  GPU检测失败: {e}，使用CPU推理")
 
-    return model
+    # 预热：用空白图跑一次推理，完成Conv+BN融合、predictor初始化（及编译），
+    # 避免把这些一次性开销算进第一批照片
+    dummy = np.zeros((config.ai.TARGET_IMAGE_SIZE, config.ai.TARGET_IMAGE_SIZE, 3), dtype=np.uint8)
 
+    def warm_up():
+        with _inference_lock:
+            model(dummy, device=model._device, half=config.ai.USE_FP16 and model._device != 'cpu',
+                  **_FULL_PREDICT_ARGS)
 
-def preprocess_image(image_path, target_size=None):
-    """预处理图像"""
-    if target_size is None:
-        target_size = config.ai.TARGET_IMAGE_SIZE
-    
-    img = cv2.imread(image_path)
-    h, w = img.shape[:2]
-    scale = target_size / max(w, h)
-    img = cv2.resize(img, (int(w * scale), int(h * scale)), interpolation=cv2.INTER_AREA)
-    return img
+    warmed_up = False
+    # 可选：torch.compile 编译网络（实验性）。编译是惰性的，错误要到第一次前向才出现，
+    # 所以在这里跑预热；失败时恢复eager网络，避免之后每批（包括CPU降级）都失败
+    if config.ai.TORCH_COMPILE:
+        eager_model = model.model
+        try:
+            # 推理设备只有 MPS/CPU，reduce-overhead 依赖的 CUDA Graphs 不可用，使用默认模式
+            model.model = torch.compile(eager_model, mode="default", fullgraph=False, dynamic=False)
+            warm_up()
+            warmed_up = True
+            print("✅ 已启用 torch.compile")
+        except Exception as e:
+            model.model = eager_model
+            model.predictor = None  # 预热时已用编译后的网络建好predictor，丢弃后按eager网络重建
+            print(f"⚠️  torch.compile 不可用: {e}，使用eager模式")
+
+    if not warmed_up:
+        try:
+            warm_up()
+        except Exception as e:
+            print(f"⚠️  模型预热失败: {e}")
 
+    # IQA 评分器随模型一起解析一次并挂在模型上，逐张处理时无需再查全局单例
+    model._iqa_scorer = get_iqa_scorer(device='mps')
 
-# 锐度计算器将根据用户选择动态创建
+    return model
+
+
+# 锐度计算器按归一化模式缓存，每种模式只创建一次（复用其内部缓冲区）
+@functools.lru_cache(maxsize=8)
 def _get_sharpness_calculator(normalization_mode=None):
     """
     获取锐度计算器实例
@@ -58,22 +121,153 @@ def _get_sharpness_calculator(normalization_mode=None):
     """
     return MaskBasedSharpnessCalculator(method='variance', normalization=normalization_mode)
 
-# 初始化全局 IQA 评分器（延迟加载）
-_iqa_scorer = None
+
+def _skip_log(message, directory=None):
+    """简洁日志级别下丢弃详细日志"""
+    pass
 
 
-def _get_iqa_scorer():
-    """获取 IQA 评分器单例"""
-    global _iqa_scorer
-    if _iqa_scorer is None:
-        _iqa_scorer = get_iqa_scorer(device='mps')
-    return _iqa_scorer
+def _file_stem(image_path):
+    """文件名（不含目录和扩展名），作为CSV的"文件名"列"""
+    return os.path.splitext(os.path.basename(image_path))[0]
+
+
+# "无鸟"CSV行中除文件名外的固定部分（按 utils.REPORT_FIELDNAMES 列顺序，导入时构建一次）
+_NO_BIRD_ROW = (
+    "否", "0.00",              # 是否有鸟, 置信度
+    "-", "-", "0.00%", "0",    # X坐标, Y坐标, 鸟占比, 像素数
+    "0.00", "0.00",            # 原始锐度, 归一化锐度
+    "-", "-",                  # NIMA美学, BRISQUE技术
+    "❌", -1,                  # 星等, 评分
+    "", "", "",                # 面积达标, 居中, 锐度达标（V3.1不再使用）
+    "-",                       # 类别ID
+)
+
+
+def _no_bird_data(file_stem):
+    """构建"无鸟"的CSV行数据（V3.1）"""
+    return (file_stem,) + _NO_BIRD_ROW
+
+
+def _crop_mask(mask, height, width, x, y, w, h):
+    """
+    从YOLO输出的掩码中截取鸟的BBox区域，并缩放到裁剪图尺寸 (h, w)
+
+    掩码是在letterbox后的推理尺寸上输出的（含居中填充），批量推理时各图片会被
+    填充到相同尺寸。先把BBox换算到掩码坐标（增益+填充偏移）在低分辨率掩码上
+    切片，再只对这一小块做一次缩放，避免整张掩码放大到原图尺寸。
+
+    mask 为推理设备上的张量时，切片和双线性缩放都在设备上完成，只把 h×w 的结果传回CPU
+    """
+    mask_h, mask_w = mask.shape[:2]
+    gain = min(mask_h / height, mask_w / width)
+    pad_x = (mask_w - width * gain) / 2
+    pad_y = (mask_h - height * gain) / 2
+
+    mx1 = min(max(int(np.floor(pad_x + x * gain)), 0), mask_w - 1)
+    my1 = min(max(int(np.floor(pad_y + y * gain)), 0), mask_h - 1)
+    mx2 = max(min(int(np.ceil(pad_x + (x + w) * gain)), mask_w), mx1 + 1)
+    my2 = max(min(int(np.ceil(pad_y + (y + h) * gain)), mask_h), my1 + 1)
+
+    if isinstance(mask, torch.Tensor):
+        patch = mask[my1:my2, mx1:mx2].float()[None, None]
+        resized = F.interpolate(patch, size=(h, w), mode='bilinear', align_corners=False)
+        return resized[0, 0].cpu().numpy()
+    return cv2.resize(mask[my1:my2, mx1:mx2], (w, h), interpolation=cv2.INTER_LINEAR)
+
+
+# 无掩码时使用的全1掩码缓冲区：按遇到的最大裁剪尺寸分配一次，之后切片复用（只读）
+_ones_buffer = np.ones((1024, 1024), dtype=np.uint8)
+
+
+def _full_mask(h, w):
+    """返回 (h, w) 的全1掩码视图，只在裁剪图超过缓冲区时重新分配"""
+    global _ones_buffer
+    buf = _ones_buffer
+    if h > buf.shape[0] or w > buf.shape[1]:
+        buf = np.ones((max(h, buf.shape[0]), max(w, buf.shape[1])), dtype=np.uint8)
+        _ones_buffer = buf
+    return buf[:h, :w]
+
+
+def _write_crop(crop_path, crop):
+    """编码为JPEG后直接写入字节（裁剪图只用于查看，质量85足够）"""
+    ok, buf = cv2.imencode('.jpg', crop, [cv2.IMWRITE_JPEG_QUALITY, CROP_JPEG_QUALITY])
+    if ok:
+        with open(crop_path, 'wb') as f:
+            f.write(buf.tobytes())
+
+
+def _run_inference(model, images, dir):
+    """
+    YOLO推理（使用加载时解析的设备，MPS失败时降级到CPU）
+
+    MPS失败后之后的批次都直接使用CPU，避免每批都先失败一次再重试
+
+    Args:
+        images: 预处理后的图像列表，一次调用完成整批推理
+
+    Returns:
+        与images一一对应的results列表，完全失败时返回None
+    """
+    device = getattr(model, '_device', 'mps')
+    try:
+        with _inference_lock:
+            # FP16 只用于GPU，CPU上半精度反而更慢
+            return model(images, device=device, half=config.ai.USE_FP16 and device != 'cpu',
+                         **_FULL_PREDICT_ARGS)
+    except Exception as device_error:
+        if device == 'cpu':
+            log_message(f"❌ AI推理完全失败: {device_error}", dir)
+            return None
+        # MPS失败，降级到CPU（后续批次保持CPU）
+        log_message(f"⚠️  MPS推理失败，降级到CPU: {device_error}", dir)
+        model._device = 'cpu'
+        try:
+            with _inference_lock:
+                return model(images, device='cpu', **_FULL_PREDICT_ARGS)
+        except Exception as cpu_error:
+            log_message(f"❌ AI推理完全失败: {cpu_error}", dir)
+            return None
+
+
+def _prescreen(model, images, dir):
+    """
+    低分辨率预筛：以 PRESCREEN_SIZE 只检测鸟类，判断每张图是否可能有鸟
+
+    Returns:
+        与images一一对应的布尔列表（True=可能有鸟，需要完整处理），推理失败时返回None（全部完整处理）
+    """
+    device = getattr(model, '_device', 'mps')
+    try:
+        with _inference_lock:
+            results = model(images, device=device,
+                            half=config.ai.USE_FP16 and device != 'cpu', imgsz=config.ai.PRESCREEN_SIZE,
+                            conf=config.ai.PRESCREEN_CONF, classes=[config.ai.BIRD_CLASS_ID])
+    except Exception as e:
+        log_message(f"⚠️  预筛推理失败，全部进行完整检测: {e}", dir)
+        return None
+    return [len(result.boxes) > 0 for result in results]
+
+
+def _safe_preprocess(image_path, dir):
+    """预处理单张图片，失败时记录日志并返回None（不影响同批其他图片）"""
+    try:
+        return preprocess_image(image_path)
+    except FileNotFoundError:
+        log_message(f"ERROR: in detect_and_draw_birds, {image_path} not found", dir)
+        return None
+    except Exception as e:
+        log_message(f"ERROR: failed to load {image_path}: {e}", dir)
+        return None
 
 
 def detect_and_draw_birds(image_path, model, output_path, dir, ui_settings):
     """
     检测并标记鸟类（V3.1 - 简化版，移除预览功能）
 
+    单张处理，等价于只有一张图片的 detect_and_draw_birds_batch
+
     Args:
         image_path: 图片路径
         model: YOLO模型
@@ -81,14 +275,172 @@ def detect_and_draw_birds(image_path, model, output_path, dir, ui_settings):
         dir: 工作目录
         ui_settings: [ai_confidence, sharpness_threshold, nima_threshold, save_crop, normalization_mode]
     """
+    return detect_and_draw_birds_batch([image_path], model, [output_path], dir, ui_settings)[0]
+
+
+def detect_and_draw_birds_batch(image_paths, model, output_paths, dir, ui_settings):
+    """
+    批量检测并标记鸟类
+
+    批内图片并行预处理后，一次YOLO调用完成整批推理，再逐张计算锐度/IQA并写入CSV
+
+    Args:
+        image_paths: 图片路径列表
+        model: YOLO模型
+        output_paths: 输出路径列表（带框图片），与image_paths等长，不需要时为None
+        dir: 工作目录
+        ui_settings: 同 detect_and_draw_birds
+
+    Returns:
+        与image_paths一一对应的结果列表，每项同 detect_and_draw_birds 的返回值，无法处理时为None
+    """
+    if output_paths is None:
+        output_paths = [None] * len(image_paths)
+    outputs = [None] * len(image_paths)
+
+    # 逐步耗时等详细日志只在"详细"日志级别下写入
+    adv_config = get_advanced_config().snapshot()
+    log_detail = log_message if adv_config.log_level == "detailed" else _skip_log
+    scorer = model._iqa_scorer
+
+    # 使用配置检查文件类型（文件是否存在由预处理时的一次 open 判断，不再单独 stat）
+    valid = []
+    for i, image_path in enumerate(image_paths):
+        ext = os.path.splitext(image_path)[1]
+        if ext not in _JPG_EXTS and ext.lower() not in _JPG_EXTS:
+            log_message("ERROR: not a jpg file", dir)
+            continue
+        valid.append(i)
+
+    if not valid:
+        return outputs
+
+    # Step 1: 图像预处理（批内并行）
+    step_start = time.time()
+    workers = min(len(valid), PREPROCESS_WORKERS)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        images = list(executor.map(lambda i: _safe_preprocess(image_paths[i], dir), valid))
+    batch = [(i, image) for i, image in zip(valid, images) if image is not None]
+    preprocess_time = (time.time() - step_start) * 1000
+    log_detail(f"  ⏱️  [1/7] 图像预处理: {preprocess_time:.1f}ms ({len(valid)}张)", dir)
+
+    if not batch:
+        return outputs
+
+    # 可选：低分辨率预筛，确定无鸟的图片直接记录为"无鸟"，不进入完整推理
+    if config.ai.PRESCREEN:
+        step_start = time.time()
+        has_bird = _prescreen(model, [image for _, image in batch], dir)
+        if has_bird is not None:
+            for (i, _), keep in zip(batch, has_bird):
+                if not keep:
+                    write_to_csv(_no_bird_data(_file_stem(image_paths[i])), dir, False)
+                    outputs[i] = (False, False, 0.0, 0.0, None, None)
+            batch = [item for item, keep in zip(batch, has_bird) if keep]
+        prescreen_time = (time.time() - step_start) * 1000
+        log_detail(f"  ⏱️  [预筛] 低分辨率检测: {prescreen_time:.1f}ms (保留{len(batch)}张)", dir)
+        if not batch:
+            return outputs
+
+    # Step 2: YOLO推理（整批一次调用）
+    step_start = time.time()
+    results = _run_inference(model, [image for _, image in batch], dir)
+    yolo_time = (time.time() - step_start) * 1000
+    log_detail(f"  ⏱️  [2/7] YOLO推理: {yolo_time:.1f}ms ({len(batch)}张)", dir)
+
+    if results is None:
+        # 返回"无鸟"结果（V3.1）
+        for i, _ in batch:
+            write_to_csv(_no_bird_data(_file_stem(image_paths[i])), dir, False)
+            outputs[i] = (False, False, 0.0, 0.0, None, None)
+        return outputs
+
+    # Step 3: 解析检测结果（在推理设备上选出每张图面积最大的鸟）
+    step_start = time.time()
+    birds = [_select_bird(result) for result in results]
+    parse_time = (time.time() - step_start) * 1000
+    log_detail(f"  ⏱️  [3/7] 结果解析: {parse_time:.1f}ms ({len(batch)}张)", dir)
+
+    # Step 4: NIMA 美学评分（使用内存中已解码的全图）
+    # 紧接YOLO在同一次加锁内完成整批的全图推理，GPU工作连续进行，后处理线程只剩裁剪图相关计算；
+    # 置信度低于阈值时评分必为0星，与 NIMA/BRISQUE 无关，跳过IQA推理
+    step_start = time.time()
+    nima_scores = [None] * len(batch)
+    nima_indices = [j for j, bird in enumerate(birds)
+                    if bird is not None and bird[1] >= adv_config.min_confidence]
+    if nima_indices:
+        with _inference_lock:
+            scores = scorer.calculate_nima_batch([batch[j][1] for j in nima_indices])
+        for j, score in zip(nima_indices, scores):
+            nima_scores[j] = score
+    nima_time = (time.time() - step_start) * 1000
+    log_detail(f"  ⏱️  [4/7] NIMA评分: {nima_time:.1f}ms ({len(nima_indices)}张)", dir)
+
+    # Step 5-7: 逐张后处理（批内并行：锐度等CPU计算并行，BRISQUE推理仍由锁串行）
+    def postprocess(j):
+        i, image = batch[j]
+        outputs[i] = _process_single_result(birds[j], nima_scores[j], image, image_paths[i],
+                                            output_paths[i], dir, ui_settings, adv_config,
+                                            log_detail, scorer)
+
+    workers = min(len(batch), POSTPROCESS_WORKERS)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        list(executor.map(postprocess, range(len(batch))))
+    return outputs
+
+
+def _select_bird(result):
+    """
+    从YOLO结果中选出面积最大的鸟
+
+    检测结果保留在推理设备上，选出后只传输这一只的框和掩码
+
+    Returns:
+        (bird_box, conf, class_id, mask)，没有鸟时返回None；
+        mask 为设备上的掩码张量，非分割模型时为None
+    """
+    boxes = result.boxes
+    xyxy = boxes.xyxy
+    if len(xyxy) == 0:
+        return None
+
+    # 向量化：非鸟类的面积记为-1，再取argmax
+    areas = (xyxy[:, 2] - xyxy[:, 0]) * (xyxy[:, 3] - xyxy[:, 1])
+    areas = torch.where(boxes.cls.int() == config.ai.BIRD_CLASS_ID,
+                        areas, torch.full_like(areas, -1.0))
+    best = torch.argmax(areas)
+
+    # 选中鸟的框、置信度、类别、面积和索引在设备上拼成一行，一次同步传回CPU
+    row = torch.cat((xyxy[best], boxes.conf[best].view(1), boxes.cls[best].view(1),
+                     areas[best].view(1), best.view(1).to(xyxy.dtype))).cpu().numpy()
+    if row[6] <= 0:
+        return None
+    bird_idx = int(row[7])
+
+    # 获取选中鸟的掩码数据（如果是分割模型），保留在设备上，裁剪缩放后再传回
+    mask = None
+    if getattr(result, 'masks', None) is not None and bird_idx < len(result.masks.data):
+        mask = result.masks.data[bird_idx]
+    return row[:4], float(row[4]), int(row[5]), mask
+
+
+def _process_single_result(bird, nima_score, image, image_path, output_path, dir, ui_settings,
+                           adv_config, log_detail, scorer):
+    """
+    处理单张图片选出的鸟：BRISQUE、锐度、评分和CSV写入
+
+    Args:
+        bird: _select_bird 的返回值，没有鸟时为None
+        nima_score: 批内已计算的全图 NIMA 分数（跳过或失败时为None）
+
+    Returns:
+        (found_bird, bird_result, AI置信度, 归一化锐度, NIMA分数, BRISQUE分数)
+    """
     # V3.1: 从 ui_settings 获取参数
     ai_confidence = ui_settings[0] / 100  # AI置信度：50-100 -> 0.5-1.0（仅用于过滤）
     sharpness_threshold = ui_settings[1]  # 锐度阈值：6000-9000
     nima_threshold = ui_settings[2]       # NIMA美学阈值：5.0-6.0
 
-    # V3.1: 不再保存Crop图片（移除预览功能）
-    save_crop = False
-
     # 锐度归一化模式（V3.1默认log_compression）
     normalization_mode = ui_settings[4] if len(ui_settings) >= 5 else 'log_compression'
 
@@ -98,307 +450,171 @@ def detect_and_draw_birds(image_path, model, output_path, dir, ui_settings):
     found_bird = False
     bird_sharp = False
     bird_result = False
-    nima_score = None  # 美学评分（全图）
     brisque_score = None  # 技术质量评分（crop图）
     # V3.1: 移除 bird_dominant, bird_centred（不再使用）
 
-    # 使用配置检查文件类型
-    if not config.is_jpg_file(image_path):
-        log_message("ERROR: not a jpg file", dir)
-        return None
-
-    if not os.path.exists(image_path):
-        log_message(f"ERROR: in detect_and_draw_birds, {image_path} not found", dir)
-        return None
-
     # 记录总处理开始时间
     total_start = time.time()
-
-    # Step 1: 图像预处理
-    step_start = time.time()
-    image = preprocess_image(image_path)
     height, width, _ = image.shape
-    preprocess_time = (time.time() - step_start) * 1000
-    log_message(f"  ⏱️  [1/7] 图像预处理: {preprocess_time:.1f}ms", dir)
+    file_stem = _file_stem(image_path)
 
-    # Step 2: YOLO推理
-    step_start = time.time()
-    # 使用MPS设备进行推理（如果可用），失败时降级到CPU
-    try:
-        # 尝试使用MPS设备
-        results = model(image, device='mps')
-    except Exception as mps_error:
-        # MPS失败，降级到CPU
-        log_message(f"⚠️  MPS推理失败，降级到CPU: {mps_error}", dir)
-        try:
-            results = model(image, device='cpu')
-        except Exception as cpu_error:
-            log_message(f"❌ AI推理完全失败: {cpu_error}", dir)
-            # 返回"无鸟"结果（V3.1）
-            data = {
-                "文件名": os.path.splitext(os.path.basename(image_path))[0],
-                "是否有鸟": "否",
-                "置信度": "0.00",
-                "X坐标": "-",
-                "Y坐标": "-",
-                "鸟占比": "0.00%",
-                "像素数": "0",
-                "原始锐度": "0.00",
-                "归一化锐度": "0.00",
-                "NIMA美学": "-",
-                "BRISQUE技术": "-",
-                "星等": "❌",
-                "评分": -1,
-                "类别ID": "-"
-            }
-            write_to_csv(data, dir, False)
-            return found_bird, bird_result, 0.0, 0.0, None, None
+    # 如果没有找到鸟，记录到CSV并返回（V3.1）
+    if bird is None:
+        data = _no_bird_data(file_stem)
+        write_to_csv(data, dir, False)
+        return found_bird, bird_result, 0.0, 0.0, None, None
 
-    yolo_time = (time.time() - step_start) * 1000
-    log_message(f"  ⏱️  [2/7] YOLO推理: {yolo_time:.1f}ms", dir)
+    bird_box, conf, class_id, mask = bird
+    if nima_score is not None:
+        log_detail(f"🎨 NIMA 美学评分: {nima_score:.2f} / 10", dir)
 
-    # Step 3: 解析检测结果
-    step_start = time.time()
-    detections = results[0].boxes.xyxy.cpu().numpy()
-    confidences = results[0].boxes.conf.cpu().numpy()
-    class_ids = results[0].boxes.cls.cpu().numpy()
-
-    # 获取掩码数据（如果是分割模型）
-    masks = None
-    if hasattr(results[0], 'masks') and results[0].masks is not None:
-        masks = results[0].masks.data.cpu().numpy()
-
-    # 只处理面积最大的鸟
-    bird_idx = -1
-    max_area = 0
-
-    for idx, (detection, conf, class_id) in enumerate(zip(detections, confidences, class_ids)):
-        if int(class_id) == config.ai.BIRD_CLASS_ID:
-            x1, y1, x2, y2 = detection
-            area = (x2 - x1) * (y2 - y1)
-            if area > max_area:
-                max_area = area
-                bird_idx = idx
+    # 只处理面积最大的那只鸟
+    x1, y1, x2, y2 = bird_box
 
-    parse_time = (time.time() - step_start) * 1000
-    log_message(f"  ⏱️  [3/7] 结果解析: {parse_time:.1f}ms", dir)
+    x = int(x1)
+    y = int(y1)
+    w = int(x2 - x1)
+    h = int(y2 - y1)
 
-    # 如果没有找到鸟，记录到CSV并返回（V3.1）
-    if bird_idx == -1:
-        data = {
-            "文件名": os.path.splitext(os.path.basename(image_path))[0],
-            "是否有鸟": "否",
-            "置信度": "0.00",
-            "X坐标": "-",
-            "Y坐标": "-",
-            "鸟占比": "0.00%",
-            "像素数": "0",
-            "原始锐度": "0.00",
-            "归一化锐度": "0.00",
-            "NIMA美学": "-",
-            "BRISQUE技术": "-",
-            "星等": "❌",
-            "评分": -1,
-            "类别ID": "-"
-        }
-        write_to_csv(data, dir, False)
-        return found_bird, bird_result, 0.0, 0.0, None, None
+    found_bird = True
+    area_ratio = (w * h) / (width * height)
+
+    # V3.1: 不再保存Crop图片（移除预览功能），需要调试时在此设置路径即可写出
+    crop_path = None
+
+    x = max(0, min(x, width - 1))
+    y = max(0, min(y, height - 1))
+    w = min(w, width - x)
+    h = min(h, height - y)
+
+    if w <= 0 or h <= 0:
+        log_message(f"ERROR: Invalid crop region for {image_path}", dir)
+        return None
 
-    # Step 4: 计算 NIMA 美学评分（使用全图，只计算一次）
-    nima_time = 0
-    if bird_idx != -1:
+    crop_img = image[y:y + h, x:x + w]
+
+    if crop_img is None or crop_img.size == 0:
+        log_message(f"ERROR: Crop image is empty for {image_path}", dir)
+        return None
+
+    # Step 5: 计算 BRISQUE 技术质量评分（使用 crop 图片）
+    if conf < adv_config.min_confidence:
+        log_detail("  ⏱️  [5/7] BRISQUE评分: 跳过（置信度低于阈值）", dir)
+    else:
         step_start = time.time()
         try:
-            scorer = _get_iqa_scorer()
-            nima_score = scorer.calculate_nima(image_path)
-            nima_time = (time.time() - step_start) * 1000
-            if nima_score is not None:
-                log_message(f"🎨 NIMA 美学评分: {nima_score:.2f} / 10", dir)
-                log_message(f"  ⏱️  [4/7] NIMA评分: {nima_time:.1f}ms", dir)
+            with _inference_lock:
+                brisque_score = scorer.calculate_brisque(crop_img)
+            brisque_time = (time.time() - step_start) * 1000
+            if brisque_score is not None:
+                log_detail(f"🔧 BRISQUE 技术质量: {brisque_score:.2f} / 100 (越低越好)", dir)
+                log_detail(f"  ⏱️  [5/7] BRISQUE评分: {brisque_time:.1f}ms", dir)
         except Exception as e:
-            nima_time = (time.time() - step_start) * 1000
-            log_message(f"⚠️  NIMA 计算失败: {e}", dir)
-            log_message(f"  ⏱️  [4/7] NIMA评分(失败): {nima_time:.1f}ms", dir)
-            nima_score = None
+            brisque_time = (time.time() - step_start) * 1000
+            log_message(f"⚠️  BRISQUE 计算失败: {e}", dir)
+            log_detail(f"  ⏱️  [5/7] BRISQUE评分(失败): {brisque_time:.1f}ms", dir)
+            brisque_score = None
 
-    # 只处理面积最大的那只鸟
-    for idx, (detection, conf, class_id) in enumerate(zip(detections, confidences, class_ids)):
-        # 跳过非鸟类或非最大面积的鸟
-        if idx != bird_idx:
-            continue
-        x1, y1, x2, y2 = detection
-
-        x = int(x1)
-        y = int(y1)
-        w = int(x2 - x1)
-        h = int(y2 - y1)
-        class_id = int(class_id)
-
-        # 使用配置中的鸟类类别 ID
-        if class_id == config.ai.BIRD_CLASS_ID:
-            found_bird = True
-            area_ratio = (w * h) / (width * height)
-            filename = os.path.basename(image_path)
-
-            # V3.1: 不再保存Crop图片
-            crop_path = None
-
-            x = max(0, min(x, width - 1))
-            y = max(0, min(y, height - 1))
-            w = min(w, width - x)
-            h = min(h, height - y)
-
-            if w <= 0 or h <= 0:
-                log_message(f"ERROR: Invalid crop region for {image_path}", dir)
-                continue
-
-            crop_img = image[y:y + h, x:x + w]
-
-            if crop_img is None or crop_img.size == 0:
-                log_message(f"ERROR: Crop image is empty for {image_path}", dir)
-                continue
-
-            # Step 5: 计算 BRISQUE 技术质量评分（使用 crop 图片）
-            step_start = time.time()
-            try:
-                scorer = _get_iqa_scorer()
-                brisque_score = scorer.calculate_brisque(crop_img)
-                brisque_time = (time.time() - step_start) * 1000
-                if brisque_score is not None:
-                    log_message(f"🔧 BRISQUE 技术质量: {brisque_score:.2f} / 100 (越低越好)", dir)
-                    log_message(f"  ⏱️  [5/7] BRISQUE评分: {brisque_time:.1f}ms", dir)
-            except Exception as e:
-                brisque_time = (time.time() - step_start) * 1000
-                log_message(f"⚠️  BRISQUE 计算失败: {e}", dir)
-                log_message(f"  ⏱️  [5/7] BRISQUE评分(失败): {brisque_time:.1f}ms", dir)
-                brisque_score = None
-
-            # Step 6: 使用新的基于掩码的锐度计算
-            step_start = time.time()
-            mask_crop = None
-            if masks is not None and idx < len(masks):
-                mask = masks[idx]
-                # 调整mask大小到图像尺寸
-                if mask.shape != (height, width):
-                    mask_resized = cv2.resize(mask, (width, height))
-                else:
-                    mask_resized = mask
-
-                # 裁剪掩码到鸟的区域
-                mask_crop = mask_resized[y:y + h, x:x + w]
-
-                # 创建带掩码的裁剪图用于可视化
-                crop_with_mask = crop_img.copy()
-
-                # 创建彩色掩码（半透明绿色）
-                mask_binary = (mask_crop > 0.5).astype(np.uint8)
-                colored_mask = np.zeros_like(crop_img)
-                colored_mask[:, :, 1] = 255  # 绿色通道
-
-                # 应用半透明掩码
-                crop_with_mask = cv2.addWeighted(
-                    crop_with_mask, 1.0,
-                    cv2.bitwise_and(colored_mask, colored_mask,
-                                   mask=mask_binary),
-                    0.4, 0
-                )
-
-                # 只有在 save_crop=True 时才保存带掩码的可视化图片
-                if crop_path:
-                    cv2.imwrite(crop_path, crop_with_mask)
-
-                # 使用新算法计算锐度（基于掩码）
-                sharpness_result = sharpness_calculator.calculate(crop_img, mask_crop)
-                real_sharpness = sharpness_result['total_sharpness']
-                sharpness = sharpness_result['normalized_sharpness']
-                effective_pixels = sharpness_result['effective_pixels']
-            else:
-                # 如果没有掩码，只在 save_crop=True 时保存普通裁剪图
-                if crop_path:
-                    cv2.imwrite(crop_path, crop_img)
-
-                # 创建全1掩码（退化为整个BBox）
-                full_mask = np.ones((h, w), dtype=np.uint8)
-                sharpness_result = sharpness_calculator.calculate(crop_img, full_mask)
-                real_sharpness = sharpness_result['total_sharpness']
-                sharpness = sharpness_result['normalized_sharpness']
-                effective_pixels = sharpness_result['effective_pixels']
-
-            sharpness_time = (time.time() - step_start) * 1000
-            log_message(f"  ⏱️  [6/7] 锐度计算: {sharpness_time:.1f}ms", dir)
-
-            cv2.rectangle(image, (x, y), (x + w, y + h), (0, 0, 255), 2)
-
-            # V3.1: 新的评分逻辑
-            # 计算中心坐标（仅用于日志输出）
-            center_x = (x + w / 2) / width
-            center_y = (y + h / 2) / height
-
-            # 日志输出
-            nima_str = f"{nima_score:.2f}" if nima_score is not None else "-"
-            brisque_str = f"{brisque_score:.2f}" if brisque_score is not None else "-"
-            log_message(f" AI: {conf:.2f} - Class: {class_id} "
-                        f"- Sharpness:{real_sharpness:.2f} (Norm:{sharpness:.2f}) "
-                        f"- Area:{area_ratio * 100:.2f}% - Pixels:{effective_pixels:,d}"
-                        f" - NIMA:{nima_str}"
-                        f" - BRISQUE:{brisque_str}"
-                        f" - Center_x:{center_x:.2f} - Center_y:{center_y:.2f}", dir)
-
-            # V3.1 星级评定规则：
-            # V3.1: 使用高级配置的阈值
-            # 1. 完全没鸟 → -1星（Rejected）
-            # 2. 置信度/噪点/美学/锐度不达标 → 0星（技术质量差）
-            # 3. 锐度 ≥ 阈值 且 NIMA ≥ 阈值 → 3星（优选）
-            # 4. 锐度 ≥ 阈值 或 NIMA ≥ 阈值 → 2星（良好）
-            # 5. 其他 → 1星（普通）
-
-            adv_config = get_advanced_config()
-
-            if conf < adv_config.min_confidence or \
-               (brisque_score is not None and brisque_score > adv_config.max_brisque) or \
-               (nima_score is not None and nima_score < adv_config.min_nima) or \
-               sharpness < adv_config.min_sharpness:
-                # 技术质量太差
-                rating_stars = "0星"
-                rating_value = 0
-            elif sharpness >= sharpness_threshold and \
-                 (nima_score is not None and nima_score >= nima_threshold):
-                # 同时满足锐度和美学标准
-                rating_stars = "⭐⭐⭐"
-                rating_value = 3
-                bird_result = True  # 标记为优选
-            elif sharpness >= sharpness_threshold or \
-                 (nima_score is not None and nima_score >= nima_threshold):
-                # 满足锐度或美学标准之一
-                rating_stars = "⭐⭐"
-                rating_value = 2
-            else:
-                # 普通照片
-                rating_stars = "⭐"
-                rating_value = 1
-
-            data = {
-                "文件名": os.path.splitext(os.path.basename(image_path))[0],
-                "是否有鸟": "是" if found_bird else "否",
-                "置信度": f"{conf:.2f}",
-                "X坐标": f"{center_x:.2f}",
-                "Y坐标": f"{center_y:.2f}",
-                "鸟占比": f"{area_ratio * 100:.2f}%",
-                "像素数": f"{effective_pixels}",
-                "原始锐度": f"{real_sharpness:.2f}",
-                "归一化锐度": f"{sharpness:.2f}",
-                "NIMA美学": f"{nima_score:.2f}" if nima_score is not None else "-",
-                "BRISQUE技术": f"{brisque_score:.2f}" if brisque_score is not None else "-",
-                "星等": rating_stars,
-                "评分": rating_value,
-                "类别ID": class_id
-            }
-
-            # Step 7: CSV写入
-            step_start = time.time()
-            write_to_csv(data, dir, False)
-            csv_time = (time.time() - step_start) * 1000
-            log_message(f"  ⏱️  [7/7] CSV写入: {csv_time:.1f}ms", dir)
+    # Step 6: 使用新的基于掩码的锐度计算
+    step_start = time.time()
+    mask_crop = None
+    if mask is not None:
+        # 只截取并缩放鸟所在区域的掩码（去除letterbox填充，在推理设备上完成，与推理串行）
+        with _inference_lock:
+            mask_crop = _crop_mask(mask, height, width, x, y, w, h)
+
+        # 只有设置了 crop_path 时才生成并保存带掩码的可视化图片（锐度计算只需要 mask_crop）
+        if crop_path:
+            # 半透明绿色：掩码内绿色通道 +0.4*255，饱和加法一次完成（无中间数组）
+            crop_with_mask = crop_img.copy()
+            mask_binary = (mask_crop > 0.5).astype(np.uint8)
+            cv2.add(crop_with_mask, _GREEN_TINT, dst=crop_with_mask, mask=mask_binary)
+            _write_crop(crop_path, crop_with_mask)
+
+        # 使用新算法计算锐度（基于掩码）
+        sharpness_result = sharpness_calculator.calculate(crop_img, mask_crop)
+        real_sharpness = sharpness_result['total_sharpness']
+        sharpness = sharpness_result['normalized_sharpness']
+        effective_pixels = sharpness_result['effective_pixels']
+    else:
+        # 如果没有掩码，只在设置了 crop_path 时保存普通裁剪图
+        if crop_path:
+            _write_crop(crop_path, crop_img)
+
+        # 创建全1掩码（退化为整个BBox）
+        full_mask = _full_mask(h, w)
+        sharpness_result = sharpness_calculator.calculate(crop_img, full_mask)
+        real_sharpness = sharpness_result['total_sharpness']
+        sharpness = sharpness_result['normalized_sharpness']
+        effective_pixels = sharpness_result['effective_pixels']
+
+    sharpness_time = (time.time() - step_start) * 1000
+    log_detail(f"  ⏱️  [6/7] 锐度计算: {sharpness_time:.1f}ms", dir)
+
+    cv2.rectangle(image, (x, y), (x + w, y + h), (0, 0, 255), 2)
+
+    # V3.1: 新的评分逻辑
+    # 计算中心坐标（仅用于日志输出）
+    center_x = (x + w / 2) / width
+    center_y = (y + h / 2) / height
+
+    # 日志输出
+    nima_str = f"{nima_score:.2f}" if nima_score is not None else "-"
+    brisque_str = f"{brisque_score:.2f}" if brisque_score is not None else "-"
+    log_message(f" AI: {conf:.2f} - Class: {class_id} "
+                f"- Sharpness:{real_sharpness:.2f} (Norm:{sharpness:.2f}) "
+                f"- Area:{area_ratio * 100:.2f}% - Pixels:{effective_pixels:,d}"
+                f" - NIMA:{nima_str}"
+                f" - BRISQUE:{brisque_str}"
+                f" - Center_x:{center_x:.2f} - Center_y:{center_y:.2f}", dir)
+
+    # V3.1 星级评定规则：
+    # V3.1: 使用高级配置的阈值
+    # 1. 完全没鸟 → -1星（Rejected）
+    # 2. 置信度/噪点/美学/锐度不达标 → 0星（技术质量差）
+    # 3. 锐度 ≥ 阈值 且 NIMA ≥ 阈值 → 3星（优选）
+    # 4. 锐度 ≥ 阈值 或 NIMA ≥ 阈值 → 2星（良好）
+    # 5. 其他 → 1星（普通）
+
+    if conf < adv_config.min_confidence or \
+       (brisque_score is not None and brisque_score > adv_config.max_brisque) or \
+       (nima_score is not None and nima_score < adv_config.min_nima) or \
+       sharpness < adv_config.min_sharpness:
+        # 技术质量太差
+        rating_stars = "0星"
+        rating_value = 0
+    elif sharpness >= sharpness_threshold and \
+         (nima_score is not None and nima_score >= nima_threshold):
+        # 同时满足锐度和美学标准
+        rating_stars = "⭐⭐⭐"
+        rating_value = 3
+        bird_result = True  # 标记为优选
+    elif sharpness >= sharpness_threshold or \
+         (nima_score is not None and nima_score >= nima_threshold):
+        # 满足锐度或美学标准之一
+        rating_stars = "⭐⭐"
+        rating_value = 2
+    else:
+        # 普通照片
+        rating_stars = "⭐"
+        rating_value = 1
+
+    # CSV行（按 utils.REPORT_FIELDNAMES 列顺序，直接以元组写入）
+    data = (
+        file_stem, "是" if found_bird else "否", f"{conf:.2f}",
+        f"{center_x:.2f}", f"{center_y:.2f}", f"{area_ratio * 100:.2f}%", effective_pixels,
+        f"{real_sharpness:.2f}", f"{sharpness:.2f}",
+        nima_str, brisque_str,
+        rating_stars, rating_value,
+        "", "", "",  # 面积达标, 居中, 锐度达标（V3.1不再使用）
+        class_id,
+    )
+
+    # Step 7: CSV写入
+    step_start = time.time()
+    write_to_csv(data, dir, False)
+    csv_time = (time.time() - step_start) * 1000
+    log_detail(f"  ⏱️  [7/7] CSV写入: {csv_time:.1f}ms", dir)
 
     # --- 修改开始 ---
     # 只有在 found_bird 为 True 且 output_path 有效时，才保存带框的图片
@@ -408,9 +624,7 @@ def detect_and_draw_birds(image_path, model, output_path, dir, ui_settings):
 
     # 计算总处理时间
     total_time = (time.time() - total_start) * 1000
-    log_message(f"  ⏱️  ========== 总耗时: {total_time:.1f}ms ==========", dir)
+    log_detail(f"  ⏱️  ========== 总耗时: {total_time:.1f}ms ==========", dir)
 
     # 返回 found_bird, bird_result, AI置信度, 归一化锐度, NIMA分数, BRISQUE分数（用于日志显示）
-    bird_confidence = float(confidences[bird_idx]) if bird_idx != -1 else 0.0
-    bird_sharpness = sharpness if bird_idx != -1 else 0.0
-    return found_bird, bird_result, bird_confidence, bird_sharpness, nima_score, brisque_score
\ No newline at end of file
+    return found_bird, bird_result, conf, sharpness, nima_score, brisque_score
\ No newline at end of file
@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+report.csv 分析脚本的公共读取工具
+各分析脚本只用到报告中的部分列，统一在这里声明并按需读取
+"""
+
+import functools
+import hashlib
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+# 分析脚本会用到的列（兼容不同版本报告的列名：'有鸟'/'是否有鸟'、'AI置信度'/'置信度'）
+NEEDED = [
+    '文件名', 'NIMA美学', '归一化锐度', '原始锐度', 'AI置信度', '置信度', '星等',
+    '是否有鸟', '有鸟', '鸟占比', '像素数', 'BRISQUE技术', 'MUSIQ综合',
+    '居中', '锐度达标', '面积达标',
+]
+_NEEDED_SET = frozenset(NEEDED)
+
+# 数值列在解析时直接定型，省去读取后逐列 to_numeric/astype 的第二遍拷贝
+# 无鸟行的 NIMA/BRISQUE 写的是 '-'，通过 NA_VALUES 解析为 NaN
+DTYPES = {
+    'NIMA美学': 'float32', 'BRISQUE技术': 'float32', 'MUSIQ综合': 'float32',
+    '归一化锐度': 'float32', '原始锐度': 'float32',
+    'AI置信度': 'float32', '置信度': 'float32',
+    '像素数': 'uint32', '鸟占比': 'str',
+    # 星等、是否有鸟只有几种取值，按 category 读入，groupby/value_counts 和
+    # df['是否有鸟'] == '是' 这类过滤都直接比较整数编码
+    '星等': 'category', '是否有鸟': 'category', '有鸟': 'category',
+}
+NA_VALUES = ['-']
+
+# Parquet 缓存的结构版本：由 NEEDED 和 DTYPES 派生，写进缓存文件名。
+# 增删列或改动列类型后旧缓存自然不再匹配，会重新解析 CSV
+_CACHE_SCHEMA = hashlib.sha1(
+    repr((NEEDED, sorted(DTYPES.items()), NA_VALUES)).encode('utf-8')
+).hexdigest()[:8]
+
+
+def buffer_stdout():
+    """
+    把 stdout 改为块缓冲，分析脚本上百行 print 合并成少量写入（退出时统一刷新）
+
+    命令行带 --stream 时保持逐行输出（并从 sys.argv 中移除该参数，不影响脚本自身的参数解析）
+    """
+    if '--stream' in sys.argv:
+        sys.argv.remove('--stream')
+        return
+    try:
+        sys.stdout.reconfigure(line_buffering=False, write_through=False)
+    except AttributeError:
+        pass  # stdout 被替换成不支持 reconfigure 的对象时保持原样
+
+
+def enable_copy_on_write() -> bool:
+    """
+    开启 pandas 写时复制：过滤后的结果再加列不会影响原表，也就不必先 .copy() 整张表
+
+    这是进程级设置，只由分析脚本在入口处调用，导入本模块不会改变 pandas 行为。
+    pandas < 1.5 没有该选项，返回 False（bird_rows 会退回显式复制）
+    """
+    try:
+        pd.set_option('mode.copy_on_write', True)
+        return True
+    except KeyError:
+        return False
+
+
+def _copy_on_write_enabled() -> bool:
+    try:
+        return bool(pd.get_option('mode.copy_on_write'))
+    except KeyError:
+        return False
+
+
+def shrink(df: pd.DataFrame, cols=None) -> pd.DataFrame:
+    """
+    把数值列收窄为 float32 / 无符号整数（原地修改并返回 df）
+
+    用于读取后才转换出来的数值列（read_report 已按 DTYPES 定型的列无需再调用）
+    """
+    for col in (df.columns if cols is None else cols):
+        kind = 'unsigned' if pd.api.types.is_integer_dtype(df[col]) else 'float'
+        df[col] = pd.to_numeric(df[col], downcast=kind)
+    return df
+
+
+def pairwise_corr(df: pd.DataFrame, cols):
+    """
+    把 cols 一次性标准化为 float32 z-score 矩阵，返回 corr_of(a, b) 查询任意两列的 Pearson 相关
+
+    每次查询只是一次点积，不再像 Series.corr 那样逐对重新求均值和标准差。
+    调用方需保证 cols 中没有缺失值；样本不足 2 个或常数列返回 NaN（与 Series.corr 一致）
+    """
+    cols = list(cols)
+    index = {col: i for i, col in enumerate(cols)}
+    n = len(df)
+    z = df[cols].to_numpy(dtype=np.float32, copy=True)  # 下面原地标准化，不能是原表的视图
+    if n >= 2:
+        with np.errstate(invalid='ignore', divide='ignore'):
+            z -= z.mean(axis=0)
+            z /= z.std(axis=0, ddof=1)
+
+    def corr_of(a, b) -> float:
+        if n < 2:
+            return float('nan')
+        return float(z[:, index[a]] @ z[:, index[b]] / (n - 1))
+
+    return corr_of
+
+
+def group_means(keys, codes, frame, columns, name):
+    """
+    按分组编码用 np.bincount 计算各列均值和照片数量
+
+    等价于 groupby(observed=True).agg({列: 'mean', '文件名': 'count'})，
+    但每列只需两次 bincount，不产生 pandas 分组中间对象
+
+    Args:
+        keys: 分组标签（与编码 0..n-1 对应）
+        codes: 每行的分组编码，-1 表示不属于任何分组
+        frame: 数据
+        columns: 求均值的列
+        name: 分组索引名
+    """
+    in_group = codes >= 0
+    codes = codes[in_group]
+    n = len(keys)
+    counts = np.bincount(codes, minlength=n)
+
+    table = {}
+    for col in columns:
+        values = frame[col].to_numpy(dtype=float)[in_group]
+        finite = ~np.isnan(values)  # 与 pandas mean 一致，跳过缺失值
+        sums = np.bincount(codes[finite], weights=values[finite], minlength=n)
+        num = np.bincount(codes[finite], minlength=n)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            table[col] = sums / num
+    table['照片数量'] = counts
+
+    result = pd.DataFrame(table, index=pd.Index(keys, name=name))
+    return result[counts > 0].round(2)
+
+
+def extreme_rows(df: pd.DataFrame, col, n=10, largest=True) -> pd.DataFrame:
+    """
+    用 np.argpartition 取出 col 最大（largest=True）或最小的 n 行，并按该列排好序
+
+    对应 nlargest(n, col) / nsmallest(n, col)，缺失值不参与排序
+    """
+    keys = df[col].to_numpy(dtype=np.float64)
+    if largest:
+        keys = -keys
+    idx = np.flatnonzero(~np.isnan(keys))
+    if len(idx) > n:
+        idx = idx[np.argpartition(keys[idx], n - 1)[:n]]
+    idx = idx[np.argsort(keys[idx], kind='stable')]
+    return df.iloc[idx]
+
+
+def top_bottom(df: pd.DataFrame, col, n=10):
+    """
+    一次 np.argpartition 同时取出 col 最大和最小的 n 行，返回 (top, bottom)
+
+    top 按值降序、bottom 按值升序，对应 nlargest(n, col) / nsmallest(n, col)；
+    col 中不能有缺失值
+    """
+    values = df[col].to_numpy()
+    if len(values) <= 2 * n:
+        order = np.argsort(values, kind='stable')
+        return df.iloc[order[::-1][:n]], df.iloc[order[:n]]
+    part = np.argpartition(values, [n - 1, len(values) - n])
+    bottom = part[:n]
+    top = part[-n:]
+    bottom = bottom[np.argsort(values[bottom], kind='stable')]
+    top = top[np.argsort(values[top], kind='stable')[::-1]]
+    return df.iloc[top], df.iloc[bottom]
+
+
+def _read_csv(csv_path) -> pd.DataFrame:
+    return pd.read_csv(csv_path, usecols=lambda c: c in _NEEDED_SET,
+                       dtype=DTYPES, na_values=NA_VALUES, keep_default_na=True)
+
+
+def _load_report(csv_path) -> pd.DataFrame:
+    """
+    优先读取 report.csv 旁的 report.<结构版本>.parquet 缓存（比 CSV 新时才使用）
+
+    缓存不存在、已过期或结构版本不符（文件名不同）时解析 CSV 并写入一次缓存；
+    缓存里只保存 NEEDED 中的列。缓存先写到临时文件再原子替换，中断时不会留下半截文件；
+    缓存损坏无法读取时删除并回退到 CSV。
+    未安装 pyarrow 或目录不可写时直接返回 CSV 解析结果
+    """
+    csv_path = str(csv_path)
+    parquet_path = f"{os.path.splitext(csv_path)[0]}.{_CACHE_SCHEMA}.parquet"
+
+    try:
+        if os.path.getmtime(parquet_path) >= os.path.getmtime(csv_path):
+            return pd.read_parquet(parquet_path)
+    except (OSError, ImportError):
+        pass
+    except Exception:
+        # 缓存文件损坏（pyarrow 抛出 ArrowInvalid 等），删掉后按 CSV 重建
+        try:
+            os.remove(parquet_path)
+        except OSError:
+            pass
+
+    df = _read_csv(csv_path)
+    tmp_path = parquet_path + '.tmp'
+    try:
+        df.to_parquet(tmp_path, compression='zstd', index=False)
+        os.replace(tmp_path, parquet_path)
+    except (OSError, ImportError, ValueError):
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+    return df
+
+
+@functools.lru_cache(maxsize=4)
+def _cached_report(csv_path: str, mtime: float) -> pd.DataFrame:
+    # mtime 参与缓存键：report.csv 重新生成后自动失效
+    return _load_report(csv_path)
+
+
+def read_report(csv_path) -> pd.DataFrame:
+    """
+    读取 report.csv，只解析 NEEDED 中的列，数值列按 DTYPES 直接定型
+
+    使用可调用的 usecols，报告中缺少的列会被忽略，不会报错；
+    重复分析同一份报告时走 Parquet 缓存（见 _load_report），同一进程内再次读取直接命中内存缓存。
+    返回的 DataFrame 是共享的缓存对象，调用方不要原地修改（先用 bird_rows 过滤）
+    """
+    csv_path = str(csv_path)
+    return _cached_report(csv_path, os.path.getmtime(csv_path))
+
+
+def bird_rows(df: pd.DataFrame) -> pd.DataFrame:
+    """只保留有鸟的行（兼容新旧报告的 '是否有鸟' / '有鸟' 列名），结果可以直接加列"""
+    col = '是否有鸟' if '是否有鸟' in df.columns else '有鸟'
+    birds = df[df[col] == '是']
+    return birds if _copy_on_write_enabled() else birds.copy()
@@ -10,6 +10,10 @@ import numpy as np
 from pathlib import Path
 import sys
 
+from analysis_common import bird_rows, enable_copy_on_write, group_means, shrink
+
+enable_copy_on_write()
+
 # CSV 文件路径
 csv_path = Path("/Volumes/990PRO4TB/2025/2025-10-17/_tmp/report.csv")
 
@@ -22,9 +26,16 @@ print("📊 IQA 评分分析报告")
 print("=" * 80)
 print(f"📁 数据源: {csv_path}\n")
 
-# 读取 CSV
+# 分析用到的列（只读取这些列）
+USECOLS = ['文件名', '是否有鸟', '置信度', '归一化锐度', '原始锐度', '鸟占比',
+           'NIMA美学', 'BRISQUE技术', '星等']
+
+# 读取 CSV（优先使用 pyarrow 多线程解析器，未安装时退回默认解析器）
 try:
-    df = pd.read_csv(csv_path)
+    try:
+        df = pd.read_csv(csv_path, usecols=USECOLS, engine='pyarrow')
+    except ImportError:
+        df = pd.read_csv(csv_path, usecols=USECOLS)
     print(f"✅ 成功读取 CSV 文件，共 {len(df)} 行数据\n")
 except Exception as e:
     print(f"❌ 读取 CSV 失败: {e}")
@@ -35,7 +46,7 @@ print("📋 CSV 列名:")
 print(f"   {', '.join(df.columns.tolist())}\n")
 
 # 只分析有鸟的照片
-df_birds = df[df['是否有鸟'] == '是'].copy()
+df_birds = bird_rows(df)
 print(f"🐦 有鸟照片数量: {len(df_birds)} / {len(df)} ({len(df_birds)/len(df)*100:.1f}%)\n")
 
 if len(df_birds) == 0:
@@ -45,19 +56,22 @@ if len(df_birds) == 0:
 # 数据清洗和转换
 print("🔧 数据预处理...")
 
-# 转换置信度
-df_birds['置信度_数值'] = df_birds['置信度'].astype(float)
-
-# 转换锐度
-df_birds['归一化锐度_数值'] = df_birds['归一化锐度'].astype(float)
-df_birds['原始锐度_数值'] = df_birds['原始锐度'].astype(float)
+# 转换置信度、锐度、NIMA 和 BRISQUE（"-" 等无效值转为 NaN），一次性加入所有数值列
+numeric_columns = {
+    '置信度_数值': '置信度',
+    '归一化锐度_数值': '归一化锐度',
+    '原始锐度_数值': '原始锐度',
+    'NIMA_数值': 'NIMA美学',
+    'BRISQUE_数值': 'BRISQUE技术',
+}
+numeric = df_birds[list(numeric_columns.values())].apply(pd.to_numeric, errors='coerce')
+numeric.columns = list(numeric_columns.keys())
 
-# 转换鸟占比
-df_birds['鸟占比_数值'] = df_birds['鸟占比'].str.rstrip('%').astype(float)
+# 转换鸟占比（去掉末尾的 %）
+numeric['鸟占比_数值'] = pd.to_numeric(df_birds['鸟占比'].astype(str).str[:-1], errors='coerce')
+shrink(numeric)
 
-# 转换 NIMA 和 BRISQUE（处理 "-" 值）
-df_birds['NIMA_数值'] = pd.to_numeric(df_birds['NIMA美学'], errors='coerce')
-df_birds['BRISQUE_数值'] = pd.to_numeric(df_birds['BRISQUE技术'], errors='coerce')
+df_birds = pd.concat([df_birds, numeric], axis=1)
 
 # 移除无效数据
 df_valid = df_birds.dropna(subset=['NIMA_数值', 'BRISQUE_数值'])
@@ -106,15 +120,19 @@ print("\n" + "=" * 80)
 print("🔗 相关性分析 (Pearson Correlation)")
 print("=" * 80)
 
-# 计算相关系数
-corr_data = df_valid[[
+# 计算相关系数（一次 np.corrcoef 得到整个矩阵）
+corr_columns = [
     '置信度_数值',
     '归一化锐度_数值',
     '原始锐度_数值',
     '鸟占比_数值',
     'NIMA_数值',
     'BRISQUE_数值'
-]].corr()
+]
+corr_data = pd.DataFrame(
+    np.corrcoef(df_valid[corr_columns].to_numpy(dtype=np.float64), rowvar=False),
+    index=corr_columns, columns=corr_columns
+)
 
 print("\n相关系数矩阵 (范围: -1 到 +1):")
 print("  +1.0 = 完全正相关")
@@ -162,13 +180,9 @@ print("=" * 80)
 
 # 按星级分层
 print("\n【按星级分组的平均值】")
-star_groups = df_valid.groupby('星等').agg({
-    '置信度_数值': 'mean',
-    '归一化锐度_数值': 'mean',
-    'NIMA_数值': 'mean',
-    'BRISQUE_数值': 'mean',
-    '文件名': 'count'
-}).round(2)
+star_codes, star_keys = pd.factorize(df_valid['星等'], sort=True)
+star_groups = group_means(star_keys, star_codes, df_valid,
+                          ['置信度_数值', '归一化锐度_数值', 'NIMA_数值', 'BRISQUE_数值'], '星等')
 star_groups.columns = ['AI置信度', '归一化锐度', 'NIMA美学', 'BRISQUE技术', '照片数量']
 print(star_groups.to_string())
 
@@ -180,12 +194,9 @@ df_valid['锐度层级'] = pd.cut(
     labels=['低锐度(0-50)', '中锐度(50-100)', '高锐度(100-150)', '极高(150+)']
 )
 
-sharpness_groups = df_valid.groupby('锐度层级', observed=True).agg({
-    '置信度_数值': 'mean',
-    'NIMA_数值': 'mean',
-    'BRISQUE_数值': 'mean',
-    '文件名': 'count'
-}).round(2)
+sharpness_groups = group_means(df_valid['锐度层级'].cat.categories,
+                               df_valid['锐度层级'].cat.codes.to_numpy(), df_valid,
+                               ['置信度_数值', 'NIMA_数值', 'BRISQUE_数值'], '锐度层级')
 sharpness_groups.columns = ['AI置信度', 'NIMA美学', 'BRISQUE技术', '照片数量']
 print(sharpness_groups.to_string())
 
@@ -197,12 +208,9 @@ df_valid['NIMA层级'] = pd.cut(
     labels=['差(0-4)', '一般(4-5)', '良好(5-6)', '优秀(6-10)']
 )
 
-nima_groups = df_valid.groupby('NIMA层级', observed=True).agg({
-    '置信度_数值': 'mean',
-    '归一化锐度_数值': 'mean',
-    'BRISQUE_数值': 'mean',
-    '文件名': 'count'
-}).round(2)
+nima_groups = group_means(df_valid['NIMA层级'].cat.categories,
+                          df_valid['NIMA层级'].cat.codes.to_numpy(), df_valid,
+                          ['置信度_数值', '归一化锐度_数值', 'BRISQUE_数值'], 'NIMA层级')
 nima_groups.columns = ['AI置信度', '归一化锐度', 'BRISQUE技术', '照片数量']
 print(nima_groups.to_string())
 
@@ -214,12 +222,9 @@ df_valid['BRISQUE层级'] = pd.cut(
     labels=['优秀(0-30)', '良好(30-50)', '一般(50-70)', '较差(70-100)']
 )
 
-brisque_groups = df_valid.groupby('BRISQUE层级', observed=True).agg({
-    '置信度_数值': 'mean',
-    '归一化锐度_数值': 'mean',
-    'NIMA_数值': 'mean',
-    '文件名': 'count'
-}).round(2)
+brisque_groups = group_means(df_valid['BRISQUE层级'].cat.categories,
+                             df_valid['BRISQUE层级'].cat.codes.to_numpy(), df_valid,
+                             ['置信度_数值', '归一化锐度_数值', 'NIMA_数值'], 'BRISQUE层级')
 brisque_groups.columns = ['AI置信度', '归一化锐度', 'NIMA美学', '照片数量']
 print(brisque_groups.to_string())
 
@@ -6,7 +6,11 @@
 """
 
 import pandas as pd
-import os
+from pathlib import Path
+
+from analysis_common import (
+    bird_rows, buffer_stdout, enable_copy_on_write, pairwise_corr, read_report, top_bottom,
+)
 
 def analyze_nima_for_bird_photography():
     """分析 NIMA 评分在鸟类摄影中的表现"""
@@ -15,13 +19,13 @@ def analyze_nima_for_bird_photography():
     print("🎨 NIMA 美学评分在鸟类摄影中的有效性分析")
     print("=" * 80)
 
-    # 查找最新的 CSV 报告
-    csv_files = []
-    for root, dirs, files in os.walk('.'):
-        for file in files:
-            if file.endswith('.csv') and 'report' in file.lower():
-                csv_path = os.path.join(root, file)
-                csv_files.append(csv_path)
+    # 查找最新的 CSV 报告（跳过 .git 等隐藏目录，每个文件只 stat 一次）
+    csv_files = [
+        (p.stat().st_mtime, p)
+        for p in Path('.').rglob('*.csv')
+        if 'report' in p.name.lower()
+        and not any(part.startswith('.') for part in p.parts[:-1])
+    ]
 
     if not csv_files:
         print("\n❌ 未找到 CSV 报告文件")
@@ -29,12 +33,12 @@ def analyze_nima_for_bird_photography():
         return
 
     # 使用最新的报告
-    latest_csv = max(csv_files, key=os.path.getmtime)
+    latest_csv = max(csv_files)[1]
     print(f"\n📂 使用报告: {latest_csv}")
 
     # 读取数据
     try:
-        df = pd.read_csv(latest_csv)
+        df = read_report(latest_csv)
     except Exception as e:
         print(f"❌ 读取 CSV 失败: {e}")
         return
@@ -48,7 +52,7 @@ def analyze_nima_for_bird_photography():
         return
 
     # 过滤有鸟的照片
-    df_birds = df[df['有鸟'] == '是'].copy()
+    df_birds = bird_rows(df)
     print(f"\n📊 数据概览:")
     print(f"   总照片数: {len(df)}")
     print(f"   有鸟照片: {len(df_birds)}")
@@ -57,13 +61,8 @@ def analyze_nima_for_bird_photography():
         print("❌ 没有检测到鸟的照片")
         return
 
-    # 转换数值
-    df_birds['NIMA_数值'] = pd.to_numeric(df_birds['NIMA美学'], errors='coerce')
-    df_birds['锐度_数值'] = pd.to_numeric(df_birds['归一化锐度'], errors='coerce')
-    df_birds['置信度_数值'] = pd.to_numeric(df_birds['AI置信度'], errors='coerce')
-
     # 移除缺失值
-    df_valid = df_birds.dropna(subset=['NIMA_数值', '锐度_数值', '置信度_数值'])
+    df_valid = df_birds.dropna(subset=['NIMA美学', '归一化锐度', 'AI置信度'])
     print(f"   有效数据: {len(df_valid)} 张")
 
     if len(df_valid) < 10:
@@ -74,20 +73,24 @@ def analyze_nima_for_bird_photography():
     print("【问题1】NIMA 能否区分不同星级的照片？")
     print("=" * 80)
 
-    star_groups = df_valid.groupby('星等').agg({
-        'NIMA_数值': ['mean', 'std', 'count'],
-        '锐度_数值': 'mean',
-        '置信度_数值': 'mean'
+    star_groups = df_valid.groupby('星等', observed=True).agg({
+        'NIMA美学': ['mean', 'std', 'count'],
+        '归一化锐度': 'mean',
+        'AI置信度': 'mean'
     }).round(3)
 
     print("\n各星级的 NIMA 平均分:")
     print(star_groups.to_string())
 
+    # 3星与1星的 NIMA 均值差只算一次，最终推荐里复用
+    star_nima_mean = star_groups[('NIMA美学', 'mean')]
+    star_diff = None
+    if '⭐⭐⭐' in star_nima_mean.index and '⭐' in star_nima_mean.index:
+        star_diff = star_nima_mean['⭐⭐⭐'] - star_nima_mean['⭐']
+
     # 检查趋势
-    if '⭐⭐⭐' in star_groups.index and '⭐' in star_groups.index:
-        nima_3star = star_groups.loc['⭐⭐⭐', ('NIMA_数值', 'mean')]
-        nima_1star = star_groups.loc['⭐', ('NIMA_数值', 'mean')]
-        diff = nima_3star - nima_1star
+    if star_diff is not None:
+        diff = star_diff
 
         print(f"\n💡 分析:")
         if diff > 0.5:
@@ -108,8 +111,9 @@ def analyze_nima_for_bird_photography():
     print("【问题2】NIMA 是否只是在评估清晰度？")
     print("=" * 80)
 
-    corr_nima_sharp = df_valid['NIMA_数值'].corr(df_valid['锐度_数值'])
-    corr_nima_conf = df_valid['NIMA_数值'].corr(df_valid['置信度_数值'])
+    corr_of = pairwise_corr(df_valid, ['NIMA美学', '归一化锐度', 'AI置信度'])
+    corr_nima_sharp = corr_of('NIMA美学', '归一化锐度')
+    corr_nima_conf = corr_of('NIMA美学', 'AI置信度')
 
     print(f"\nNIMA 与其他指标的相关性:")
     print(f"   NIMA vs 锐度:     {corr_nima_sharp:+.3f}")
@@ -134,9 +138,9 @@ def analyze_nima_for_bird_photography():
     print("【问题3】NIMA 最高分的照片质量如何？")
     print("=" * 80)
 
-    top_nima = df_valid.nlargest(10, 'NIMA_数值')[
-        ['文件名', 'NIMA_数值', '锐度_数值', '置信度_数值', '星等']
-    ]
+    # Top10 和 Bottom10 用同一个排序键，一次 argpartition 同时取出
+    top_nima, bottom_nima = top_bottom(
+        df_valid[['文件名', 'NIMA美学', '归一化锐度', 'AI置信度', '星等']], 'NIMA美学', 10)
     top_nima.columns = ['文件名', 'NIMA', '锐度', 'AI置信度', '星级']
 
     print("\nNIMA 最高的 10 张照片:")
@@ -144,6 +148,7 @@ def analyze_nima_for_bird_photography():
 
     # 统计星级分布
     top_nima_stars = top_nima['星级'].value_counts()
+    top_nima_stars = top_nima_stars[top_nima_stars > 0]
     print(f"\n星级分布:")
     for star, count in top_nima_stars.items():
         print(f"   {star}: {count} 张")
@@ -161,9 +166,6 @@ def analyze_nima_for_bird_photography():
     print("【问题4】NIMA 最低分的照片是否确实质量差？")
     print("=" * 80)
 
-    bottom_nima = df_valid.nsmallest(10, 'NIMA_数值')[
-        ['文件名', 'NIMA_数值', '锐度_数值', '置信度_数值', '星等']
-    ]
     bottom_nima.columns = ['文件名', 'NIMA', '锐度', 'AI置信度', '星级']
 
     print("\nNIMA 最低的 10 张照片:")
@@ -192,8 +194,8 @@ def analyze_nima_for_bird_photography():
     reasons = []
 
     # 评分标准1: 能否区分星级
-    if '⭐⭐⭐' in star_groups.index and '⭐' in star_groups.index:
-        diff = star_groups.loc['⭐⭐⭐', ('NIMA_数值', 'mean')] - star_groups.loc['⭐', ('NIMA_数值', 'mean')]
+    if star_diff is not None:
+        diff = star_diff
         if diff > 0.5:
             score += 30
             reasons.append("✅ NIMA 能明显区分星级")
@@ -309,4 +311,6 @@ def analyze_nima_for_bird_photography():
 
 
 if __name__ == "__main__":
+    buffer_stdout()
+    enable_copy_on_write()
     analyze_nima_for_bird_photography()
@@ -10,6 +10,11 @@ import numpy as np
 from pathlib import Path
 import sys
 
+from analysis_common import bird_rows, buffer_stdout, enable_copy_on_write, pairwise_corr, read_report
+
+buffer_stdout()
+enable_copy_on_write()
+
 # CSV 文件路径
 csv_path = Path("/Volumes/990PRO4TB/2025/2025-10-17/_tmp/report.csv")
 
@@ -24,29 +29,23 @@ print(f"📁 数据源: {csv_path}\n")
 
 # 读取 CSV
 try:
-    df = pd.read_csv(csv_path)
+    df = read_report(csv_path)
     print(f"✅ 成功读取 CSV 文件，共 {len(df)} 行数据\n")
 except Exception as e:
     print(f"❌ 读取 CSV 失败: {e}")
     sys.exit(1)
 
 # 只分析有鸟的照片
-df_birds = df[df['是否有鸟'] == '是'].copy()
+df_birds = bird_rows(df)
 print(f"🐦 有鸟照片数量: {len(df_birds)} / {len(df)} ({len(df_birds)/len(df)*100:.1f}%)\n")
 
 # 数据预处理
 print("🔧 数据预处理...")
-df_birds['置信度_数值'] = df_birds['置信度'].astype(float)
-df_birds['归一化锐度_数值'] = df_birds['归一化锐度'].astype(float)
-df_birds['鸟占比_数值'] = df_birds['鸟占比'].str.rstrip('%').astype(float)
-df_birds['像素数_数值'] = df_birds['像素数'].astype(int)
-
-# 转换 NIMA 和 BRISQUE
-df_birds['NIMA_数值'] = pd.to_numeric(df_birds['NIMA美学'], errors='coerce')
-df_birds['BRISQUE_数值'] = pd.to_numeric(df_birds['BRISQUE技术'], errors='coerce')
+# 数值列已在 read_report 中按 DTYPES 定型，只需解析百分比
+df_birds['鸟占比_数值'] = df_birds['鸟占比'].str.rstrip('%').astype('float32')
 
 # 移除无效数据
-df_valid = df_birds.dropna(subset=['NIMA_数值', 'BRISQUE_数值'])
+df_valid = df_birds.dropna(subset=['NIMA美学', 'BRISQUE技术'])
 print(f"   有效数据: {len(df_valid)} 张\n")
 
 # === 倒推原始锐度（方差） ===
@@ -60,14 +59,18 @@ print("  推导：原始锐度 = 归一化锐度 × sqrt(有效像素数)")
 print()
 
 # 计算倒推的原始锐度
-df_valid['倒推原始锐度'] = df_valid['归一化锐度_数值'] * np.sqrt(df_valid['像素数_数值'])
+# 在同一个 float32 缓冲区里先开方再相乘，不产生中间数组
+back_raw = df_valid['像素数'].to_numpy(dtype=np.float32)
+np.sqrt(back_raw, out=back_raw)
+np.multiply(df_valid['归一化锐度'].to_numpy(), back_raw, out=back_raw)
+df_valid['倒推原始锐度'] = back_raw
 
 # 验证倒推的准确性（如果CSV中有原始锐度列）
 if '原始锐度' in df_valid.columns:
-    df_valid['原始锐度_数值'] = df_valid['原始锐度'].astype(float)
-
     # 计算误差
-    df_valid['误差'] = abs(df_valid['倒推原始锐度'] - df_valid['原始锐度_数值'])
+    error = np.subtract(back_raw, df_valid['原始锐度'].to_numpy())
+    np.abs(error, out=error)
+    df_valid['误差'] = error
     avg_error = df_valid['误差'].mean()
     max_error = df_valid['误差'].max()
 
@@ -78,7 +81,7 @@ if '原始锐度' in df_valid.columns:
 
     if avg_error < 1.0:
         print(f"  ✅ 倒推准确（误差 < 1.0），直接使用CSV中的原始锐度")
-        df_valid['原始方差锐度'] = df_valid['原始锐度_数值']
+        df_valid['原始方差锐度'] = df_valid['原始锐度']
     else:
         print(f"  ⚠️  倒推与CSV不一致，CSV中的'原始锐度'可能不是方差值")
         print(f"     将使用倒推的方差值进行分析")
@@ -99,9 +102,13 @@ print("\n" + "=" * 80)
 print("🔗 相关性对比：归一化 vs 原始方差")
 print("=" * 80)
 
+# 相关性对比用到的列一次性标准化，之后每对相关系数只是一次点积
+corr_cols = ['归一化锐度', '原始方差锐度', 'NIMA美学', 'BRISQUE技术', '鸟占比_数值']
+corr_of = pairwise_corr(df_valid, corr_cols)
+
 print("\n【与 NIMA 美学的相关性】")
-corr_norm_nima = df_valid['归一化锐度_数值'].corr(df_valid['NIMA_数值'])
-corr_raw_nima = df_valid['原始方差锐度'].corr(df_valid['NIMA_数值'])
+corr_norm_nima = corr_of('归一化锐度', 'NIMA美学')
+corr_raw_nima = corr_of('原始方差锐度', 'NIMA美学')
 
 print(f"  归一化锐度 vs NIMA: {corr_norm_nima:+.3f}")
 print(f"  原始方差 vs NIMA:   {corr_raw_nima:+.3f}")
@@ -113,8 +120,8 @@ else:
     print(f"  ⚠️  归一化锐度相关性更强")
 
 print("\n【与 BRISQUE 技术质量的相关性】")
-corr_norm_brisque = df_valid['归一化锐度_数值'].corr(df_valid['BRISQUE_数值'])
-corr_raw_brisque = df_valid['原始方差锐度'].corr(df_valid['BRISQUE_数值'])
+corr_norm_brisque = corr_of('归一化锐度', 'BRISQUE技术')
+corr_raw_brisque = corr_of('原始方差锐度', 'BRISQUE技术')
 
 print(f"  归一化锐度 vs BRISQUE: {corr_norm_brisque:+.3f}")
 print(f"  原始方差 vs BRISQUE:   {corr_raw_brisque:+.3f}")
@@ -126,8 +133,8 @@ else:
     print(f"  ⚠️  归一化锐度相关性更强")
 
 print("\n【与鸟占比的相关性（检查偏差）】")
-corr_norm_area = df_valid['归一化锐度_数值'].corr(df_valid['鸟占比_数值'])
-corr_raw_area = df_valid['原始方差锐度'].corr(df_valid['鸟占比_数值'])
+corr_norm_area = corr_of('归一化锐度', '鸟占比_数值')
+corr_raw_area = corr_of('原始方差锐度', '鸟占比_数值')
 
 print(f"  归一化锐度 vs 鸟占比: {corr_norm_area:+.3f} (越接近0越公平)")
 print(f"  原始方差 vs 鸟占比:   {corr_raw_area:+.3f} (越接近0越公平)")
@@ -150,10 +157,10 @@ df_valid['占比层级'] = pd.cut(
 )
 
 area_groups = df_valid.groupby('占比层级', observed=True).agg({
-    '归一化锐度_数值': 'mean',
+    '归一化锐度': 'mean',
     '原始方差锐度': 'mean',
-    'NIMA_数值': 'mean',
-    'BRISQUE_数值': 'mean',
+    'NIMA美学': 'mean',
+    'BRISQUE技术': 'mean',
     '文件名': 'count'
 }).round(2)
 
@@ -171,22 +178,26 @@ print("\n" + "=" * 80)
 print("🔬 分组相关性分析（小鸟 vs 大鸟）")
 print("=" * 80)
 
-small_birds = df_valid[df_valid['鸟占比_数值'] < 10]
-large_birds = df_valid[df_valid['鸟占比_数值'] > 20]
+# 分组只需要相关性用到的几列：先投影再用 query 过滤，不复制整张表
+corr_frame = df_valid[corr_cols]
+small_birds = corr_frame.query('鸟占比_数值 < 10')
+large_birds = corr_frame.query('鸟占比_数值 > 20')
+small_corr = pairwise_corr(small_birds, corr_cols)
+large_corr = pairwise_corr(large_birds, corr_cols)
 
 print("\n【小鸟组（<10%）】")
 print(f"  样本数: {len(small_birds)}")
-print(f"  归一化锐度 vs NIMA:    {small_birds['归一化锐度_数值'].corr(small_birds['NIMA_数值']):+.3f}")
-print(f"  原始方差 vs NIMA:      {small_birds['原始方差锐度'].corr(small_birds['NIMA_数值']):+.3f}")
-print(f"  归一化锐度 vs BRISQUE: {small_birds['归一化锐度_数值'].corr(small_birds['BRISQUE_数值']):+.3f}")
-print(f"  原始方差 vs BRISQUE:   {small_birds['原始方差锐度'].corr(small_birds['BRISQUE_数值']):+.3f}")
+print(f"  归一化锐度 vs NIMA:    {small_corr('归一化锐度', 'NIMA美学'):+.3f}")
+print(f"  原始方差 vs NIMA:      {small_corr('原始方差锐度', 'NIMA美学'):+.3f}")
+print(f"  归一化锐度 vs BRISQUE: {small_corr('归一化锐度', 'BRISQUE技术'):+.3f}")
+print(f"  原始方差 vs BRISQUE:   {small_corr('原始方差锐度', 'BRISQUE技术'):+.3f}")
 
 print("\n【大鸟组（>20%）】")
 print(f"  样本数: {len(large_birds)}")
-print(f"  归一化锐度 vs NIMA:    {large_birds['归一化锐度_数值'].corr(large_birds['NIMA_数值']):+.3f}")
-print(f"  原始方差 vs NIMA:      {large_birds['原始方差锐度'].corr(large_birds['NIMA_数值']):+.3f}")
-print(f"  归一化锐度 vs BRISQUE: {large_birds['归一化锐度_数值'].corr(large_birds['BRISQUE_数值']):+.3f}")
-print(f"  原始方差 vs BRISQUE:   {large_birds['原始方差锐度'].corr(large_birds['BRISQUE_数值']):+.3f}")
+print(f"  归一化锐度 vs NIMA:    {large_corr('归一化锐度', 'NIMA美学'):+.3f}")
+print(f"  原始方差 vs NIMA:      {large_corr('原始方差锐度', 'NIMA美学'):+.3f}")
+print(f"  归一化锐度 vs BRISQUE: {large_corr('归一化锐度', 'BRISQUE技术'):+.3f}")
+print(f"  原始方差 vs BRISQUE:   {large_corr('原始方差锐度', 'BRISQUE技术'):+.3f}")
 
 # === 极值分析 ===
 print("\n" + "=" * 80)
@@ -194,15 +205,15 @@ print("🏆 Top 10 对比：归一化锐度 vs 原始方差锐度")
 print("=" * 80)
 
 print("\n【按归一化锐度排序 Top 10】")
-top_norm = df_valid.nlargest(10, '归一化锐度_数值')[
-    ['文件名', '归一化锐度_数值', '原始方差锐度', 'NIMA_数值', 'BRISQUE_数值', '鸟占比_数值']
+top_norm = df_valid.nlargest(10, '归一化锐度')[
+    ['文件名', '归一化锐度', '原始方差锐度', 'NIMA美学', 'BRISQUE技术', '鸟占比_数值']
 ]
 top_norm.columns = ['文件名', '归一化锐度', '原始方差', 'NIMA', 'BRISQUE', '鸟占比%']
 print(top_norm.to_string(index=False))
 
 print("\n【按原始方差锐度排序 Top 10】")
 top_raw = df_valid.nlargest(10, '原始方差锐度')[
-    ['文件名', '归一化锐度_数值', '原始方差锐度', 'NIMA_数值', 'BRISQUE_数值', '鸟占比_数值']
+    ['文件名', '归一化锐度', '原始方差锐度', 'NIMA美学', 'BRISQUE技术', '鸟占比_数值']
 ]
 top_raw.columns = ['文件名', '归一化锐度', '原始方差', 'NIMA', 'BRISQUE', '鸟占比%']
 print(top_raw.to_string(index=False))
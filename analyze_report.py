@@ -4,25 +4,31 @@
 分析 report.csv 中各评判标准的相关性
 """
 
+import argparse
+import os
+
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-from scipy.stats import pearsonr, spearmanr
+from analysis_common import bird_rows, buffer_stdout, enable_copy_on_write, read_report
+
+buffer_stdout()
+enable_copy_on_write()
 
-# 设置中文字体
-plt.rcParams['font.sans-serif'] = ['Arial Unicode MS', 'SimHei']
-plt.rcParams['axes.unicode_minus'] = False
+# 命令行参数：默认只输出文字分析，--plot 时才导入 matplotlib 并生成图表
+parser = argparse.ArgumentParser(description='分析 report.csv 中各评判标准的相关性')
+parser.add_argument('csv_path', nargs='?',
+                    default='/Volumes/990PRO4TB/2025/2025-08-17/_tmp/report.csv',
+                    help='report.csv 路径')
+parser.add_argument('--plot', action='store_true', help='生成并保存可视化图表')
+parser.add_argument('--dpi', type=int, default=300, help='图表分辨率（快速迭代时可用 100）')
+args = parser.parse_args()
 
 # 读取数据
-import sys
-if len(sys.argv) > 1:
-    csv_path = sys.argv[1]
-else:
-    csv_path = '/Volumes/990PRO4TB/2025/2025-08-17/_tmp/report.csv'
-df = pd.read_csv(csv_path)
+csv_path = args.csv_path
+df = read_report(csv_path)
 
 # 只保留有鸟的数据
-df = df[df['是否有鸟'] == '是'].copy()
+df = bird_rows(df)
 
 print(f"总共有 {len(df)} 张有鸟的照片")
 print("\n" + "="*80)
@@ -34,28 +40,18 @@ print(df.head())
 numeric_cols = ['置信度', '鸟占比', '原始锐度', '归一化锐度', 'NIMA美学', 'BRISQUE技术', 'MUSIQ综合', '居中', '锐度达标']
 
 # 转换百分比
-df['鸟占比_数值'] = df['鸟占比'].str.rstrip('%').astype(float)
-
-# 转换布尔值为数值
-df['居中_数值'] = (df['居中'] == '是').astype(int)
-df['锐度达标_数值'] = (df['锐度达标'] == '是').astype(int)
-df['面积达标_数值'] = (df['面积达标'] == '是').astype(int)
+df['鸟占比_数值'] = df['鸟占比'].str.rstrip('%').astype('float32')
 
-# 转换数值类型列
-numeric_convert_cols = ['NIMA美学', '置信度', '归一化锐度']
-# 检查可选列是否存在
-for col in ['BRISQUE技术', 'MUSIQ综合']:
-    if col in df.columns:
-        numeric_convert_cols.append(col)
-
-for col in numeric_convert_cols:
-    df[col] = pd.to_numeric(df[col], errors='coerce')
+# 转换布尔值为数值（一次哈希映射，int8 存储）
+for col in ['居中', '锐度达标', '面积达标']:
+    df[col + '_数值'] = df[col].map({'是': 1, '否': 0}).fillna(0).astype('int8')
 
 # 统计星级分布
 print("\n" + "="*80)
 print("星级分布:")
 print("="*80)
 star_counts = df['星等'].value_counts().sort_index()
+star_counts = star_counts[star_counts > 0]
 for star, count in star_counts.items():
     print(f"{star}: {count} 张 ({count/len(df)*100:.1f}%)")
 
@@ -64,7 +60,7 @@ print("\n" + "="*80)
 print("不同星级的指标均值:")
 print("="*80)
 
-star_groups = df.groupby('星等')
+star_groups = df.groupby('星等', observed=True)
 stats_cols = ['置信度', '鸟占比_数值', '归一化锐度', 'NIMA美学', 'BRISQUE技术', 'MUSIQ综合']
 
 for col in stats_cols:
@@ -81,7 +77,14 @@ print("="*80)
 
 corr_cols = ['置信度', '鸟占比_数值', '归一化锐度', 'NIMA美学', 'BRISQUE技术', 'MUSIQ综合',
              '居中_数值', '锐度达标_数值', '面积达标_数值']
-corr_df = df[corr_cols].corr()
+# 无缺失值时一次 np.corrcoef 得到整个矩阵；有缺失值时退回 pandas 的成对相关
+corr_values = df[corr_cols].to_numpy(dtype=np.float32)
+if np.isnan(corr_values).any():
+    corr_df = df[corr_cols].corr()
+else:
+    with np.errstate(invalid='ignore', divide='ignore'):
+        corr_df = pd.DataFrame(np.corrcoef(corr_values, rowvar=False),
+                               index=corr_cols, columns=corr_cols)
 
 print("\n完整相关性矩阵:")
 print(corr_df.round(3))
@@ -97,68 +100,75 @@ iqa_metrics = ['NIMA美学', 'BRISQUE技术', 'MUSIQ综合']
 for orig in original_criteria:
     print(f"\n{orig.replace('_数值', '')}:")
     for iqa in iqa_metrics:
-        corr = df[orig].corr(df[iqa])
+        corr = corr_df.loc[orig, iqa]
         print(f"  与 {iqa} 的相关性: {corr:.3f}")
 
 # 分析：锐度指标 vs BRISQUE
 print("\n" + "="*80)
 print("锐度指标详细分析:")
 print("="*80)
-print(f"归一化锐度 vs BRISQUE: {df['归一化锐度'].corr(df['BRISQUE技术']):.3f}")
-print(f"归一化锐度 vs MUSIQ: {df['归一化锐度'].corr(df['MUSIQ综合']):.3f}")
-print(f"归一化锐度 vs NIMA: {df['归一化锐度'].corr(df['NIMA美学']):.3f}")
+print(f"归一化锐度 vs BRISQUE: {corr_df.loc['归一化锐度', 'BRISQUE技术']:.3f}")
+print(f"归一化锐度 vs MUSIQ: {corr_df.loc['归一化锐度', 'MUSIQ综合']:.3f}")
+print(f"归一化锐度 vs NIMA: {corr_df.loc['归一化锐度', 'NIMA美学']:.3f}")
 
 # 分析置信度的影响
 print("\n" + "="*80)
 print("置信度与其他指标的关系:")
 print("="*80)
 for col in ['鸟占比_数值', '归一化锐度', 'NIMA美学', 'BRISQUE技术', 'MUSIQ综合']:
-    corr = df['置信度'].corr(df[col])
+    corr = corr_df.loc['置信度', col]
     print(f"置信度 vs {col}: {corr:.3f}")
 
-# 可视化
-fig, axes = plt.subplots(2, 2, figsize=(15, 12))
-
-# 1. 相关性热力图 (手动实现)
-im = axes[0, 0].imshow(corr_df.values, cmap='coolwarm', vmin=-1, vmax=1, aspect='auto')
-axes[0, 0].set_xticks(range(len(corr_df.columns)))
-axes[0, 0].set_yticks(range(len(corr_df.columns)))
-axes[0, 0].set_xticklabels(corr_df.columns, rotation=45, ha='right', fontsize=8)
-axes[0, 0].set_yticklabels(corr_df.columns, fontsize=8)
-axes[0, 0].set_title('指标相关性热力图', fontsize=14, fontweight='bold')
-# 添加数值标注
-for i in range(len(corr_df.columns)):
-    for j in range(len(corr_df.columns)):
-        text = axes[0, 0].text(j, i, f'{corr_df.values[i, j]:.2f}',
-                              ha="center", va="center", color="black", fontsize=6)
-plt.colorbar(im, ax=axes[0, 0])
-
-# 2. 星级分布
-star_counts.plot(kind='bar', ax=axes[0, 1], color=['#FFD700', '#FFA500', '#FF6347'])
-axes[0, 1].set_title('星级分布', fontsize=14, fontweight='bold')
-axes[0, 1].set_xlabel('星级')
-axes[0, 1].set_ylabel('数量')
-axes[0, 1].tick_params(axis='x', rotation=0)
-
-# 3. 归一化锐度 vs BRISQUE
-axes[1, 0].scatter(df['归一化锐度'], df['BRISQUE技术'], alpha=0.5)
-axes[1, 0].set_xlabel('归一化锐度')
-axes[1, 0].set_ylabel('BRISQUE技术质量')
-axes[1, 0].set_title(f'锐度 vs BRISQUE (相关性: {df["归一化锐度"].corr(df["BRISQUE技术"]):.3f})',
-                     fontsize=12, fontweight='bold')
-
-# 4. 不同星级的NIMA美学分数箱线图
-df.boxplot(column='NIMA美学', by='星等', ax=axes[1, 1])
-axes[1, 1].set_title('不同星级的NIMA美学分数分布', fontsize=12, fontweight='bold')
-axes[1, 1].set_xlabel('星级')
-axes[1, 1].set_ylabel('NIMA美学分数')
-plt.suptitle('')  # 移除默认标题
-
-plt.tight_layout()
-output_dir = os.path.dirname(csv_path)
-output_path = os.path.join(output_dir, 'correlation_analysis.png')
-plt.savefig(output_path, dpi=300, bbox_inches='tight')
-print(f"\n可视化图表已保存到: {output_path}")
+# 可视化（仅 --plot 时导入 matplotlib 并渲染）
+if args.plot:
+    import matplotlib.pyplot as plt
+
+    # 设置中文字体
+    plt.rcParams['font.sans-serif'] = ['Arial Unicode MS', 'SimHei']
+    plt.rcParams['axes.unicode_minus'] = False
+
+    fig, axes = plt.subplots(2, 2, figsize=(15, 12))
+
+    # 1. 相关性热力图 (手动实现)
+    corr_values = corr_df.to_numpy()
+    im = axes[0, 0].imshow(corr_values, cmap='coolwarm', vmin=-1, vmax=1, aspect='auto')
+    axes[0, 0].set_xticks(range(len(corr_df.columns)))
+    axes[0, 0].set_yticks(range(len(corr_df.columns)))
+    axes[0, 0].set_xticklabels(corr_df.columns, rotation=45, ha='right', fontsize=8)
+    axes[0, 0].set_yticklabels(corr_df.columns, fontsize=8)
+    axes[0, 0].set_title('指标相关性热力图', fontsize=14, fontweight='bold')
+    # 添加数值标注
+    for (i, j), value in np.ndenumerate(corr_values):
+        axes[0, 0].text(j, i, f'{value:.2f}',
+                        ha="center", va="center", color="black", fontsize=6)
+    plt.colorbar(im, ax=axes[0, 0])
+
+    # 2. 星级分布
+    star_counts.plot(kind='bar', ax=axes[0, 1], color=['#FFD700', '#FFA500', '#FF6347'])
+    axes[0, 1].set_title('星级分布', fontsize=14, fontweight='bold')
+    axes[0, 1].set_xlabel('星级')
+    axes[0, 1].set_ylabel('数量')
+    axes[0, 1].tick_params(axis='x', rotation=0)
+
+    # 3. 归一化锐度 vs BRISQUE
+    axes[1, 0].scatter(df['归一化锐度'], df['BRISQUE技术'], alpha=0.5)
+    axes[1, 0].set_xlabel('归一化锐度')
+    axes[1, 0].set_ylabel('BRISQUE技术质量')
+    axes[1, 0].set_title(f'锐度 vs BRISQUE (相关性: {corr_df.loc["归一化锐度", "BRISQUE技术"]:.3f})',
+                         fontsize=12, fontweight='bold')
+
+    # 4. 不同星级的NIMA美学分数箱线图
+    df.boxplot(column='NIMA美学', by='星等', ax=axes[1, 1])
+    axes[1, 1].set_title('不同星级的NIMA美学分数分布', fontsize=12, fontweight='bold')
+    axes[1, 1].set_xlabel('星级')
+    axes[1, 1].set_ylabel('NIMA美学分数')
+    plt.suptitle('')  # 移除默认标题
+
+    plt.tight_layout()
+    output_dir = os.path.dirname(csv_path)
+    output_path = os.path.join(output_dir, 'correlation_analysis.png')
+    plt.savefig(output_path, dpi=args.dpi, bbox_inches='tight')
+    print(f"\n可视化图表已保存到: {output_path}")
 
 # 关键发现总结
 print("\n" + "="*80)
@@ -5,11 +5,48 @@
 分析当前锐度算法是否对大鸟面积存在低估问题
 """
 
+import math
 import pandas as pd
 import numpy as np
 from pathlib import Path
 import sys
 
+from analysis_common import bird_rows, buffer_stdout, enable_copy_on_write, pairwise_corr, read_report
+
+# 尝试导入 numba（可选，用于单次遍历同时算出四种归一化变体）
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+
+if NUMBA_AVAILABLE:
+    @njit(parallel=True, cache=True, fastmath=True)
+    def _norm_variants(raw, px, out):
+        """只读一遍 raw/px，把 sqrt/linear/log/gentle 四种归一化结果写入 out 的四列"""
+        for i in prange(raw.shape[0]):
+            r = raw[i]
+            p = px[i]
+            out[i, 0] = r / math.sqrt(p)
+            out[i, 1] = r / p
+            out[i, 2] = r / math.log10(p + 10.0)
+            out[i, 3] = r / p ** 0.35
+else:
+    def _norm_variants(raw, px, out):
+        """numpy 版本：用 out= 直接写入目标列，不产生额外的临时数组"""
+        np.sqrt(px, out=out[:, 0])
+        np.divide(raw, out[:, 0], out=out[:, 0])
+        np.divide(raw, px, out=out[:, 1])
+        np.add(px, 10, out=out[:, 2])
+        np.log10(out[:, 2], out=out[:, 2])
+        np.divide(raw, out[:, 2], out=out[:, 2])
+        np.power(px, 0.35, out=out[:, 3])
+        np.divide(raw, out[:, 3], out=out[:, 3])
+
+buffer_stdout()
+enable_copy_on_write()
+
 # CSV 文件路径
 csv_path = Path("/Volumes/990PRO4TB/2025/2025-10-17/_tmp/report.csv")
 
@@ -24,14 +61,14 @@ print(f"📁 数据源: {csv_path}\n")
 
 # 读取 CSV
 try:
-    df = pd.read_csv(csv_path)
+    df = read_report(csv_path)
     print(f"✅ 成功读取 CSV 文件，共 {len(df)} 行数据\n")
 except Exception as e:
     print(f"❌ 读取 CSV 失败: {e}")
     sys.exit(1)
 
 # 只分析有鸟的照片
-df_birds = df[df['是否有鸟'] == '是'].copy()
+df_birds = bird_rows(df)
 print(f"🐦 有鸟照片数量: {len(df_birds)} / {len(df)} ({len(df_birds)/len(df)*100:.1f}%)\n")
 
 if len(df_birds) == 0:
@@ -40,18 +77,11 @@ if len(df_birds) == 0:
 
 # 数据预处理
 print("🔧 数据预处理...")
-df_birds['置信度_数值'] = df_birds['置信度'].astype(float)
-df_birds['归一化锐度_数值'] = df_birds['归一化锐度'].astype(float)
-df_birds['原始锐度_数值'] = df_birds['原始锐度'].astype(float)
-df_birds['鸟占比_数值'] = df_birds['鸟占比'].str.rstrip('%').astype(float)
-df_birds['像素数_数值'] = df_birds['像素数'].astype(int)
-
-# 转换 NIMA 和 BRISQUE
-df_birds['NIMA_数值'] = pd.to_numeric(df_birds['NIMA美学'], errors='coerce')
-df_birds['BRISQUE_数值'] = pd.to_numeric(df_birds['BRISQUE技术'], errors='coerce')
+# 数值列已在 read_report 中按 DTYPES 定型，只需解析百分比
+df_birds['鸟占比_数值'] = df_birds['鸟占比'].str.rstrip('%').astype('float32')
 
 # 移除无效数据
-df_valid = df_birds.dropna(subset=['NIMA_数值', 'BRISQUE_数值'])
+df_valid = df_birds.dropna(subset=['NIMA美学', 'BRISQUE技术'])
 print(f"   有效数据: {len(df_valid)} 张\n")
 
 # === 核心分析：锐度 vs 鸟占比 ===
@@ -64,11 +94,27 @@ print("  方法: variance (拉普拉斯方差)")
 print("  归一化: sqrt (除以像素数平方根)")
 print("  公式: 归一化锐度 = 原始锐度 / sqrt(有效像素数)")
 
-# 计算相关性
-corr_norm_area = df_valid['归一化锐度_数值'].corr(df_valid['鸟占比_数值'])
-corr_raw_area = df_valid['原始锐度_数值'].corr(df_valid['鸟占比_数值'])
-corr_norm_pixels = df_valid['归一化锐度_数值'].corr(df_valid['像素数_数值'])
-corr_raw_pixels = df_valid['原始锐度_数值'].corr(df_valid['像素数_数值'])
+# 计算相关性：各指标与各种归一化变体堆叠成一个数组，用 pairwise_corr 一次标准化后按需查询
+# 前 6 列直接取自报告，后 4 列是模拟的不同归一化方法（由 _norm_variants 原地写入）
+bias_sources = {
+    '归一化锐度': '归一化锐度', '原始锐度': '原始锐度', '像素数': '像素数',
+    '鸟占比': '鸟占比_数值', 'NIMA': 'NIMA美学', 'BRISQUE': 'BRISQUE技术',
+}
+bias_names = list(bias_sources) + ['sqrt归一化', 'linear归一化', 'log归一化', 'gentle归一化']
+bias_matrix = np.empty((len(df_valid), len(bias_names)), dtype=np.float32)
+for i, col in enumerate(bias_sources.values()):
+    bias_matrix[:, i] = df_valid[col].to_numpy()
+_norm_variants(bias_matrix[:, 1], bias_matrix[:, 2], bias_matrix[:, len(bias_sources):])
+# 锐度/像素数缺失或归一化后出现 inf 的行不参与相关性计算（pairwise_corr 要求没有缺失值）；
+# 样本不足或常数列时相关系数为 NaN，不会产生 RuntimeWarning
+bias_matrix = bias_matrix[np.isfinite(bias_matrix).all(axis=1)]
+bias_frame = pd.DataFrame(bias_matrix, columns=bias_names)
+bias_corr = pairwise_corr(bias_frame, bias_names)
+
+corr_norm_area = bias_corr('归一化锐度', '鸟占比')
+corr_raw_area = bias_corr('原始锐度', '鸟占比')
+corr_norm_pixels = bias_corr('归一化锐度', '像素数')
+corr_raw_pixels = bias_corr('原始锐度', '像素数')
 
 print("\n【相关性分析】")
 print(f"  归一化锐度 vs 鸟占比: {corr_norm_area:+.3f}")
@@ -99,12 +145,12 @@ df_valid['占比层级'] = pd.cut(
 )
 
 area_groups = df_valid.groupby('占比层级', observed=True).agg({
-    '归一化锐度_数值': 'mean',
-    '原始锐度_数值': 'mean',
-    'NIMA_数值': 'mean',
-    'BRISQUE_数值': 'mean',
-    '置信度_数值': 'mean',
-    '像素数_数值': 'mean',
+    '归一化锐度': 'mean',
+    '原始锐度': 'mean',
+    'NIMA美学': 'mean',
+    'BRISQUE技术': 'mean',
+    '置信度': 'mean',
+    '像素数': 'mean',
     '文件名': 'count'
 }).round(2)
 
@@ -116,20 +162,13 @@ print("\n" + "=" * 80)
 print("🔬 归一化方法对比（理论模拟）")
 print("=" * 80)
 
-# 模拟不同归一化方法
-df_valid['sqrt归一化'] = df_valid['原始锐度_数值'] / np.sqrt(df_valid['像素数_数值'])
-df_valid['linear归一化'] = df_valid['原始锐度_数值'] / df_valid['像素数_数值']
-df_valid['log归一化'] = df_valid['原始锐度_数值'] / np.log10(df_valid['像素数_数值'] + 10)
-df_valid['gentle归一化'] = df_valid['原始锐度_数值'] / (df_valid['像素数_数值'] ** 0.35)
-df_valid['无归一化'] = df_valid['原始锐度_数值']
-
-# 计算各方法与鸟占比的相关性
+# 各归一化方法与鸟占比的相关性（已在上面的相关矩阵中算好）
 methods = {
-    'sqrt (当前)': df_valid['sqrt归一化'].corr(df_valid['鸟占比_数值']),
-    'linear (方案A)': df_valid['linear归一化'].corr(df_valid['鸟占比_数值']),
-    'log (方案C)': df_valid['log归一化'].corr(df_valid['鸟占比_数值']),
-    'gentle (温和)': df_valid['gentle归一化'].corr(df_valid['鸟占比_数值']),
-    '无归一化': df_valid['无归一化'].corr(df_valid['鸟占比_数值'])
+    'sqrt (当前)': bias_corr('sqrt归一化', '鸟占比'),
+    'linear (方案A)': bias_corr('linear归一化', '鸟占比'),
+    'log (方案C)': bias_corr('log归一化', '鸟占比'),
+    'gentle (温和)': bias_corr('gentle归一化', '鸟占比'),
+    '无归一化': bias_corr('原始锐度', '鸟占比')
 }
 
 print("\n【各归一化方法与鸟占比的相关性】")
@@ -145,8 +184,8 @@ print("\n" + "=" * 80)
 print("🎨 美学/技术质量 vs 鸟占比")
 print("=" * 80)
 
-corr_nima_area = df_valid['NIMA_数值'].corr(df_valid['鸟占比_数值'])
-corr_brisque_area = df_valid['BRISQUE_数值'].corr(df_valid['鸟占比_数值'])
+corr_nima_area = bias_corr('NIMA', '鸟占比')
+corr_brisque_area = bias_corr('BRISQUE', '鸟占比')
 
 print(f"\n  NIMA美学 vs 鸟占比:   {corr_nima_area:+.3f}")
 print(f"  BRISQUE技术 vs 鸟占比: {corr_brisque_area:+.3f}")
@@ -164,21 +203,33 @@ print("\n" + "=" * 80)
 print("🔗 锐度 vs NIMA/BRISQUE（按鸟大小分组）")
 print("=" * 80)
 
+# 分组相关性：在同一个堆叠数组上按行筛选，只取 锐度/NIMA/BRISQUE 三列
+sharp_iqa_cols = ['归一化锐度', 'NIMA', 'BRISQUE']
+
+
+def sharpness_iqa_corr(rows):
+    """返回 (归一化锐度 vs NIMA, 归一化锐度 vs BRISQUE)"""
+    corr_of = pairwise_corr(bias_frame[rows], sharp_iqa_cols)
+    return corr_of('归一化锐度', 'NIMA'), corr_of('归一化锐度', 'BRISQUE')
+
+
+area_pct = bias_matrix[:, bias_names.index('鸟占比')]
+
 print("\n【小鸟组（<10%）】")
-small_birds = df_valid[df_valid['鸟占比_数值'] < 10]
-if len(small_birds) > 50:
-    corr_small_nima = small_birds['归一化锐度_数值'].corr(small_birds['NIMA_数值'])
-    corr_small_brisque = small_birds['归一化锐度_数值'].corr(small_birds['BRISQUE_数值'])
-    print(f"  样本数: {len(small_birds)}")
+small_rows = area_pct < 10
+small_count = int(small_rows.sum())
+if small_count > 50:
+    corr_small_nima, corr_small_brisque = sharpness_iqa_corr(small_rows)
+    print(f"  样本数: {small_count}")
     print(f"  归一化锐度 vs NIMA:    {corr_small_nima:+.3f}")
     print(f"  归一化锐度 vs BRISQUE: {corr_small_brisque:+.3f}")
 
 print("\n【大鸟组（>20%）】")
-large_birds = df_valid[df_valid['鸟占比_数值'] > 20]
-if len(large_birds) > 50:
-    corr_large_nima = large_birds['归一化锐度_数值'].corr(large_birds['NIMA_数值'])
-    corr_large_brisque = large_birds['归一化锐度_数值'].corr(large_birds['BRISQUE_数值'])
-    print(f"  样本数: {len(large_birds)}")
+large_rows = area_pct > 20
+large_count = int(large_rows.sum())
+if large_count > 50:
+    corr_large_nima, corr_large_brisque = sharpness_iqa_corr(large_rows)
+    print(f"  样本数: {large_count}")
     print(f"  归一化锐度 vs NIMA:    {corr_large_nima:+.3f}")
     print(f"  归一化锐度 vs BRISQUE: {corr_large_brisque:+.3f}")
 
@@ -9,6 +9,9 @@
 import pandas as pd
 import numpy as np
 import sys
+import warnings
+
+from analysis_common import bird_rows, enable_copy_on_write, extreme_rows, group_means, read_report, shrink
 
 def analyze_technical_metrics(csv_path):
     """分析技术指标之间的关系"""
@@ -20,7 +23,7 @@ def analyze_technical_metrics(csv_path):
 
     # 读取数据
     try:
-        df = pd.read_csv(csv_path)
+        df = read_report(csv_path)
         print(f"✅ 成功读取 {len(df)} 条记录\n")
     except Exception as e:
         print(f"❌ 读取失败: {e}")
@@ -31,22 +34,29 @@ def analyze_technical_metrics(csv_path):
     print(f"   {', '.join(df.columns.tolist())}\n")
 
     # 过滤有鸟的照片
-    df_birds = df[df['是否有鸟'] == '是'].copy()
+    df_birds = bird_rows(df)
     print(f"🐦 有鸟照片: {len(df_birds)} 张")
 
     if len(df_birds) == 0:
         print("❌ 没有检测到鸟的照片")
         return
 
-    # 数据预处理
-    df_birds['置信度_数值'] = pd.to_numeric(df_birds['置信度'], errors='coerce')
-    df_birds['归一化锐度_数值'] = pd.to_numeric(df_birds['归一化锐度'], errors='coerce')
-    df_birds['原始锐度_数值'] = pd.to_numeric(df_birds['原始锐度'], errors='coerce')
-    df_birds['NIMA_数值'] = pd.to_numeric(df_birds['NIMA美学'], errors='coerce')
-    df_birds['BRISQUE_数值'] = pd.to_numeric(df_birds['BRISQUE技术'], errors='coerce')
+    # 数据预处理：数值列在一个子表上一次转换（"-" 等无效值转为 NaN），再一次性拼回
+    numeric_columns = {
+        '置信度': '置信度_数值',
+        '归一化锐度': '归一化锐度_数值',
+        '原始锐度': '原始锐度_数值',
+        'NIMA美学': 'NIMA_数值',
+        'BRISQUE技术': 'BRISQUE_数值',
+    }
+    numeric = shrink(
+        df_birds[list(numeric_columns)].apply(pd.to_numeric, errors='coerce')
+    ).rename(columns=numeric_columns)
 
     # 处理鸟占比（去掉百分号）
-    df_birds['鸟占比_数值'] = df_birds['鸟占比'].str.rstrip('%').astype(float)
+    numeric['鸟占比_数值'] = df_birds['鸟占比'].str.rstrip('%').astype('float32')
+
+    df_birds = pd.concat([df_birds, numeric], axis=1)
 
     # 移除缺失值
     df_valid = df_birds.dropna(subset=['置信度_数值', '归一化锐度_数值', 'NIMA_数值', 'BRISQUE_数值'])
@@ -61,24 +71,39 @@ def analyze_technical_metrics(csv_path):
     print("【1】基础统计信息")
     print("=" * 90)
 
-    stats = pd.DataFrame({
-        'AI置信度': df_valid['置信度_数值'].describe(),
-        '归一化锐度': df_valid['归一化锐度_数值'].describe(),
-        '原始锐度': df_valid['原始锐度_数值'].describe(),
-        'NIMA美学': df_valid['NIMA_数值'].describe(),
-        'BRISQUE技术': df_valid['BRISQUE_数值'].describe(),
-        '鸟占比%': df_valid['鸟占比_数值'].describe()
-    }).round(2)
-
-    print(stats.to_string())
+    # 六列堆成一个 float32 数组，一次算出 describe() 的全部统计量（分位数只排序一次）
+    stats_columns = {
+        '置信度_数值': 'AI置信度',
+        '归一化锐度_数值': '归一化锐度',
+        '原始锐度_数值': '原始锐度',
+        'NIMA_数值': 'NIMA美学',
+        'BRISQUE_数值': 'BRISQUE技术',
+        '鸟占比_数值': '鸟占比%',
+    }
+    values = df_valid[list(stats_columns)].to_numpy(dtype=np.float32)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)  # 全为 NaN 的列返回 NaN 即可
+        q25, q50, q75 = np.nanpercentile(values, [25, 50, 75], axis=0)
+        stats = pd.DataFrame(
+            [np.count_nonzero(~np.isnan(values), axis=0),
+             np.nanmean(values, axis=0),
+             np.nanstd(values, axis=0, ddof=1),
+             np.nanmin(values, axis=0),
+             q25, q50, q75,
+             np.nanmax(values, axis=0)],
+            index=['count', 'mean', 'std', 'min', '25%', '50%', '75%', 'max'],
+            columns=list(stats_columns.values()),
+        )
+
+    print(stats.round(2).to_string())
     print()
 
     # 分析分布特征
     print("💡 分布特征:")
 
     # NIMA分布
-    nima_mean = df_valid['NIMA_数值'].mean()
-    nima_std = df_valid['NIMA_数值'].std()
+    nima_mean = stats.at['mean', 'NIMA美学']
+    nima_std = stats.at['std', 'NIMA美学']
     print(f"   NIMA: 均值={nima_mean:.2f}, 标准差={nima_std:.2f}", end="")
     if nima_std < 0.3:
         print(" → 变化很小，区分能力弱 ⚠️")
@@ -88,8 +113,8 @@ def analyze_technical_metrics(csv_path):
         print(" → 有明显变化，区分能力好 ✅")
 
     # BRISQUE分布
-    brisque_mean = df_valid['BRISQUE_数值'].mean()
-    brisque_std = df_valid['BRISQUE_数值'].std()
+    brisque_mean = stats.at['mean', 'BRISQUE技术']
+    brisque_std = stats.at['std', 'BRISQUE技术']
     print(f"   BRISQUE: 均值={brisque_mean:.2f}, 标准差={brisque_std:.2f}", end="")
     if brisque_std < 3:
         print(" → 变化很小，区分能力弱 ⚠️")
@@ -99,8 +124,8 @@ def analyze_technical_metrics(csv_path):
         print(" → 有明显变化，区分能力好 ✅")
 
     # 锐度分布
-    sharp_mean = df_valid['归一化锐度_数值'].mean()
-    sharp_std = df_valid['归一化锐度_数值'].std()
+    sharp_mean = stats.at['mean', '归一化锐度']
+    sharp_std = stats.at['std', '归一化锐度']
     print(f"   归一化锐度: 均值={sharp_mean:.2f}, 标准差={sharp_std:.2f}", end="")
     if sharp_std < 500:
         print(" → 变化很小，区分能力弱 ⚠️")
@@ -195,13 +220,18 @@ def analyze_technical_metrics(csv_path):
     print("【4】指标冲突检测")
     print("=" * 90)
 
-    # 找出高锐度但低NIMA的照片
-    df_valid['锐度百分位'] = df_valid['归一化锐度_数值'].rank(pct=True)
-    df_valid['NIMA百分位'] = df_valid['NIMA_数值'].rank(pct=True)
-    df_valid['BRISQUE百分位'] = (100 - df_valid['BRISQUE_数值']).rank(pct=True)  # 反转
+    # 只需要各列的 25% / 75% 分位数作阈值，不必对每列排序求百分位排名
+    conflict_values = df_valid[['归一化锐度_数值', 'NIMA_数值', 'BRISQUE_数值']].to_numpy(dtype=np.float32)
+    (sharp_q25, nima_q25, brisque_q25), (sharp_q75, nima_q75, brisque_q75) = \
+        np.nanpercentile(conflict_values, [25, 75], axis=0)
+    sharp_arr, nima_arr, brisque_arr = conflict_values.T
+    sharp_hi, sharp_lo = sharp_arr > sharp_q75, sharp_arr < sharp_q25
+    nima_hi, nima_lo = nima_arr > nima_q75, nima_arr < nima_q25
+    # BRISQUE 越低越好：技术质量 Top25% 对应 BRISQUE 最低的 25%
+    quality_hi, quality_lo = brisque_arr < brisque_q25, brisque_arr > brisque_q75
 
     # 冲突1: 高锐度但低NIMA
-    conflict1 = df_valid[(df_valid['锐度百分位'] > 0.75) & (df_valid['NIMA百分位'] < 0.25)]
+    conflict1 = df_valid.iloc[np.flatnonzero(sharp_hi & nima_lo)]
     print(f"\n⚠️  冲突1: 高锐度(Top25%) 但 低NIMA(Bottom25%)")
     print(f"   数量: {len(conflict1)} 张")
     if len(conflict1) > 0:
@@ -210,7 +240,7 @@ def analyze_technical_metrics(csv_path):
         print(f"   💡 这些照片很清晰，但NIMA认为不好看")
 
     # 冲突2: 高NIMA但低锐度
-    conflict2 = df_valid[(df_valid['NIMA百分位'] > 0.75) & (df_valid['锐度百分位'] < 0.25)]
+    conflict2 = df_valid.iloc[np.flatnonzero(nima_hi & sharp_lo)]
     print(f"\n⚠️  冲突2: 高NIMA(Top25%) 但 低锐度(Bottom25%)")
     print(f"   数量: {len(conflict2)} 张")
     if len(conflict2) > 0:
@@ -219,7 +249,7 @@ def analyze_technical_metrics(csv_path):
         print(f"   💡 NIMA认为好看，但清晰度不够")
 
     # 冲突3: 高锐度但高BRISQUE（理论上不应该）
-    conflict3 = df_valid[(df_valid['锐度百分位'] > 0.75) & (df_valid['BRISQUE百分位'] < 0.25)]
+    conflict3 = df_valid.iloc[np.flatnonzero(sharp_hi & quality_lo)]
     print(f"\n⚠️  冲突3: 高锐度(Top25%) 但 高BRISQUE/低技术质量(Bottom25%)")
     print(f"   数量: {len(conflict3)} 张")
     if len(conflict3) > 0:
@@ -228,9 +258,7 @@ def analyze_technical_metrics(csv_path):
         print(f"   💡 锐度高但BRISQUE认为技术质量差，可能是噪点或其他问题")
 
     # 一致性: 高锐度+低BRISQUE+高NIMA (理想照片)
-    ideal = df_valid[(df_valid['锐度百分位'] > 0.75) &
-                     (df_valid['BRISQUE百分位'] > 0.75) &
-                     (df_valid['NIMA百分位'] > 0.75)]
+    ideal = df_valid.iloc[np.flatnonzero(sharp_hi & quality_hi & nima_hi)]
     print(f"\n✅ 理想照片: 高锐度(Top25%) + 低BRISQUE(Top25%) + 高NIMA(Top25%)")
     print(f"   数量: {len(ideal)} 张 ({len(ideal)/len(df_valid)*100:.1f}%)")
     if len(ideal) > 0:
@@ -244,20 +272,13 @@ def analyze_technical_metrics(csv_path):
     print("【5】按鸟占比分层分析")
     print("=" * 90)
 
-    # 分为小鸟、中鸟、大鸟
-    df_valid['鸟大小'] = pd.cut(
-        df_valid['鸟占比_数值'],
-        bins=[0, 15, 30, 100],
-        labels=['小鸟(<15%)', '中鸟(15-30%)', '大鸟(>30%)']
-    )
-
-    size_groups = df_valid.groupby('鸟大小', observed=True).agg({
-        '归一化锐度_数值': 'mean',
-        'NIMA_数值': 'mean',
-        'BRISQUE_数值': 'mean',
-        '置信度_数值': 'mean',
-        '文件名': 'count'
-    }).round(2)
+    # 分为小鸟、中鸟、大鸟：(0,15] / (15,30] / (30,100]，与 pd.cut 相同，区间外记为 -1
+    area = df_valid['鸟占比_数值'].to_numpy()
+    size_codes = np.searchsorted([15, 30], area, side='left')
+    size_codes[~((area > 0) & (area <= 100))] = -1
+
+    size_groups = group_means(['小鸟(<15%)', '中鸟(15-30%)', '大鸟(>30%)'], size_codes, df_valid,
+                              ['归一化锐度_数值', 'NIMA_数值', 'BRISQUE_数值', '置信度_数值'], '鸟大小')
 
     size_groups.columns = ['平均锐度', '平均NIMA', '平均BRISQUE', '平均AI置信度', '照片数']
 
@@ -292,29 +313,26 @@ def analyze_technical_metrics(csv_path):
 
     print("\n🏆 Top 10 照片对比:\n")
 
+    # 三张排行榜共用同一组列：先投影一次，再各自用 argpartition 取前 10
+    extreme_frame = df_valid[['文件名', 'NIMA_数值', '归一化锐度_数值', 'BRISQUE_数值', '置信度_数值', '鸟占比_数值']]
+
     # 按NIMA排序
     print("【按 NIMA 排序 - Top 10】")
-    top_nima = df_valid.nlargest(10, 'NIMA_数值')[
-        ['文件名', 'NIMA_数值', '归一化锐度_数值', 'BRISQUE_数值', '置信度_数值', '鸟占比_数值']
-    ]
+    top_nima = extreme_rows(extreme_frame, 'NIMA_数值', 10)
     top_nima.columns = ['文件名', 'NIMA', '锐度', 'BRISQUE', 'AI置信度', '鸟占比%']
     print(top_nima.to_string(index=False))
     print(f"平均值: NIMA={top_nima['NIMA'].mean():.2f}, 锐度={top_nima['锐度'].mean():.2f}, BRISQUE={top_nima['BRISQUE'].mean():.2f}")
 
     # 按锐度排序
     print("\n【按 锐度 排序 - Top 10】")
-    top_sharp = df_valid.nlargest(10, '归一化锐度_数值')[
-        ['文件名', 'NIMA_数值', '归一化锐度_数值', 'BRISQUE_数值', '置信度_数值', '鸟占比_数值']
-    ]
+    top_sharp = extreme_rows(extreme_frame, '归一化锐度_数值', 10)
     top_sharp.columns = ['文件名', 'NIMA', '锐度', 'BRISQUE', 'AI置信度', '鸟占比%']
     print(top_sharp.to_string(index=False))
     print(f"平均值: NIMA={top_sharp['NIMA'].mean():.2f}, 锐度={top_sharp['锐度'].mean():.2f}, BRISQUE={top_sharp['BRISQUE'].mean():.2f}")
 
     # 按BRISQUE排序(越低越好)
     print("\n【按 BRISQUE 排序 - Top 10 (越低越好)】")
-    top_brisque = df_valid.nsmallest(10, 'BRISQUE_数值')[
-        ['文件名', 'NIMA_数值', '归一化锐度_数值', 'BRISQUE_数值', '置信度_数值', '鸟占比_数值']
-    ]
+    top_brisque = extreme_rows(extreme_frame, 'BRISQUE_数值', 10, largest=False)
     top_brisque.columns = ['文件名', 'NIMA', '锐度', 'BRISQUE', 'AI置信度', '鸟占比%']
     print(top_brisque.to_string(index=False))
     print(f"平均值: NIMA={top_brisque['NIMA'].mean():.2f}, 锐度={top_brisque['锐度'].mean():.2f}, BRISQUE={top_brisque['BRISQUE'].mean():.2f}")
@@ -426,6 +444,8 @@ def analyze_technical_metrics(csv_path):
 
 
 if __name__ == "__main__":
+    enable_copy_on_write()
+
     # 默认路径
     default_path = "/Volumes/990PRO4TB/2025/2025-10-17/_tmp/report.csv"
 
@@ -58,6 +58,14 @@ class AIConfig:
     BIRD_CLASS_ID: int = 14              # YOLO 模型中鸟类的类别 ID
     TARGET_IMAGE_SIZE: int = 1024        # 图像预处理目标尺寸（保持1024以维持锐度值一致性）
     CENTER_THRESHOLD: float = 0.15       # 鸟类位置中心阈值
+    BATCH_SIZE: int = 8                  # 每次YOLO推理的图片数（批量推理摊薄调用开销，4-16为宜）
+    USE_FP16: bool = True                # GPU(MPS)上以FP16半精度推理YOLO；旧版macOS异常时设为False退回FP32
+    TORCH_COMPILE: bool = False          # 实验性：用 torch.compile 编译YOLO网络（MPS支持不完整，默认关闭）
+
+    # 低分辨率预筛（默认关闭）：先以小尺寸快速检测，确定无鸟的图片不再做完整推理和IQA评分
+    PRESCREEN: bool = False
+    PRESCREEN_SIZE: int = 320            # 预筛推理尺寸
+    PRESCREEN_CONF: float = 0.10         # 预筛中鸟的最高置信度低于此值即判定为无鸟
 
     # 锐度计算配置
     SHARPNESS_NORMALIZATION: str = None  # 锐度归一化方法：None(推荐), 'sqrt', 'linear', 'log', 'gentle'
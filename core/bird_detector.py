@@ -2,15 +2,20 @@
 鸟类检测器 - 核心层
 负责AI模型加载、图像处理和鸟类检测
 """
+import atexit
 import os
 import cv2
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
 import numpy as np
+import torch
 from ultralytics import YOLO
-from typing import Optional, Tuple, Dict, Any
+from typing import Optional, Tuple, Dict, Any, List
 from dataclasses import dataclass
 from .config_manager import config_manager
 from .file_manager import file_manager
-from improved_sharpness import improved_sharpness_calculator, select_largest_bird
+from improved_sharpness import improved_sharpness_calculator
+from image_decode import preprocess_image as decode_scaled_image
 
 
 @dataclass
@@ -54,10 +59,23 @@ class ProcessingThresholds:
 class BirdDetector:
     """鸟类检测器，处理AI模型和图像检测"""
     
+    # 批量检测时并行预处理（解码/缩放）的线程数，OpenCV 和 TurboJPEG 解码期间会释放 GIL
+    PREPROCESS_WORKERS = 4
+    # 裁剪图只用于查看，JPEG 质量 85 足够（与主流程一致）
+    CROP_JPEG_QUALITY = 85
+    
     def __init__(self):
         self.config = config_manager
         self.file_manager = file_manager
         self._model: Optional[YOLO] = None
+        self._device = 'cpu'
+        self._half = False
+        # 裁剪图的编码和写盘放到后台线程，与下一张图的推理重叠
+        self._io_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="crop-writer")
+        self._pending_crops = []
+        self._pending_lock = threading.Lock()
+        # 进程退出时写完剩余裁剪图并关闭线程池（与 utils.flush_log / flush_csv 相同）
+        atexit.register(self.close)
     
     # ============ 模型管理 ============
     def load_model(self) -> YOLO:
@@ -68,9 +86,28 @@ class BirdDetector:
                 raise FileNotFoundError(f"Model file not found: {model_path}")
             
             self._model = YOLO(str(model_path))
+            self._device = self._select_device()
+            # 半精度只用于GPU（CUDA/MPS），CPU上FP16反而更慢
+            self._half = self.config.get_use_fp16() and self._device != 'cpu'
             
         return self._model
     
+    @staticmethod
+    def _select_device() -> str:
+        """加载时解析一次推理设备：CUDA > Apple MPS > CPU"""
+        try:
+            if torch.cuda.is_available():
+                return 'cuda'
+            if torch.backends.mps.is_available():
+                return 'mps'
+        except Exception:
+            pass
+        return 'cpu'
+    
+    def _predict(self, images):
+        """在加载时选定的设备和精度上推理"""
+        return self.load_model()(images, device=self._device, half=self._half, verbose=False)
+    
     def get_model(self) -> Optional[YOLO]:
         """获取已加载的模型"""
         return self._model
@@ -93,20 +130,16 @@ class BirdDetector:
         if target_size is None:
             target_size = self.config.get_target_image_size()
         
-        img = cv2.imread(image_path)
-        if img is None:
+        # 与主流程共用按比例缩小解码（TurboJPEG / OpenCV reduced 模式），不再先解码全尺寸再缩放
+        try:
+            return decode_scaled_image(image_path, target_size)
+        except ValueError:
             raise ValueError(f"Failed to load image: {image_path}")
-        
-        h, w = img.shape[:2]
-        scale = target_size / max(w, h)
-        new_w, new_h = int(w * scale), int(h * scale)
-        
-        img = cv2.resize(img, (new_w, new_h), interpolation=cv2.INTER_AREA)
-        return img
     
-    def calculate_sharpness(self, image: np.ndarray) -> float:
-        """计算图像清晰度"""
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    def calculate_sharpness(self, image: np.ndarray, gray: Optional[np.ndarray] = None) -> float:
+        """计算图像清晰度（已有灰度图时传入 gray，跳过颜色转换）"""
+        if gray is None:
+            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
         laplacian = cv2.Laplacian(gray, cv2.CV_64F)
         sharpness = cv2.norm(laplacian, cv2.NORM_L2)
         return sharpness
@@ -132,42 +165,94 @@ class BirdDetector:
         
         try:
             # 加载模型和预处理图像
-            model = self.load_model()
             image = self.preprocess_image(image_path)
-            height, width, _ = image.shape
             
             # 运行检测
-            results = model(image)
-            detections = results[0].boxes.xyxy.cpu().numpy()
-            confidences = results[0].boxes.conf.cpu().numpy()
-            class_ids = results[0].boxes.cls.cpu().numpy()
-            
-            work_dir = os.path.dirname(image_path)
-            
-            # 选择面积最大的鸟类
-            largest_bird = select_largest_bird(detections, confidences, class_ids, 
-                                             self.config.get_bird_class_id())
-            
-            if largest_bird:
-                detection, conf, class_id = largest_bird
-                return self._process_bird_detection(
-                    image, detection, conf, class_id, image_path,
-                    thresholds, crop_temp_dir, width, height
-                )
-            
-            # 没有发现鸟类
-            return DetectionResult(
-                found_bird=False, bird_selected=False, confidence=0.0,
-                bird_area_ratio=0.0, bird_center_x=0.0, bird_center_y=0.0,
-                sharpness=0.0, real_sharpness=0.0, is_dominant=False,
-                is_centered=False, is_sharp=False, class_id=-1
-            )
+            results = self._predict(image)
+            return self._result_to_detection(results[0], image, image_path, thresholds, crop_temp_dir)
             
         except Exception as e:
             work_dir = os.path.dirname(image_path)
             self.file_manager.write_log(f"ERROR in bird detection: {e}", work_dir)
             return None
     
+    def detect_birds_in_images(self, image_paths: List[str], thresholds: ProcessingThresholds,
+                               crop_temp_dir: Optional[str] = None) -> List[Optional[DetectionResult]]:
+        """
+        批量检测多张图像中的鸟类（并行预处理，一次前向推理）
+        
+        Args:
+            image_paths: 图像文件路径列表
+            thresholds: 处理阈值
+            crop_temp_dir: 裁剪图片保存目录
+            
+        Returns:
+            与 image_paths 一一对应的 DetectionResult 或 None（该图处理失败）
+        """
+        outputs: List[Optional[DetectionResult]] = [None] * len(image_paths)
+        if not image_paths:
+            return outputs
+        
+        def safe_preprocess(image_path):
+            if not self.config.is_supported_image_file(image_path):
+                self.file_manager.write_log("ERROR: not a supported image file", os.path.dirname(image_path))
+                return None
+            try:
+                return self.preprocess_image(image_path)
+            except Exception as e:
+                self.file_manager.write_log(f"ERROR in bird detection: {e}", os.path.dirname(image_path))
+                return None
+        
+        workers = min(self.PREPROCESS_WORKERS, len(image_paths))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            images = list(executor.map(safe_preprocess, image_paths))
+        
+        valid = [i for i, image in enumerate(images) if image is not None]
+        if not valid:
+            return outputs
+        
+        try:
+            results = self._predict([images[i] for i in valid])
+        except Exception as e:
+            for i in valid:
+                self.file_manager.write_log(f"ERROR in bird detection: {e}", os.path.dirname(image_paths[i]))
+            return outputs
+        
+        for i, result in zip(valid, results):
+            try:
+                outputs[i] = self._result_to_detection(
+                    result, images[i], image_paths[i], thresholds, crop_temp_dir
+                )
+            except Exception as e:
+                self.file_manager.write_log(f"ERROR in bird detection: {e}", os.path.dirname(image_paths[i]))
+        return outputs
+    
+    def _result_to_detection(self, result, image: np.ndarray, image_path: str,
+                             thresholds: ProcessingThresholds,
+                             crop_temp_dir: Optional[str]) -> DetectionResult:
+        """把单张图像的YOLO结果转换为 DetectionResult"""
+        height, width, _ = image.shape
+        # 选择面积最大的鸟类：在推理设备上按类别过滤并求面积最大者，只把这一行拷回主机
+        # boxes.data 是 [N, 6] 的 (x1, y1, x2, y2, conf, cls)
+        data = result.boxes.data
+        birds = data[data[:, 5] == self.config.get_bird_class_id()]
+        
+        if birds.shape[0] > 0:
+            areas = (birds[:, 2] - birds[:, 0]) * (birds[:, 3] - birds[:, 1])
+            row = birds[areas.argmax()].cpu().numpy()
+            return self._process_bird_detection(
+                image, row[:4], float(row[4]), row[5], image_path,
+                thresholds, crop_temp_dir, width, height
+            )
+        
+        # 没有发现鸟类
+        return DetectionResult(
+            found_bird=False, bird_selected=False, confidence=0.0,
+            bird_area_ratio=0.0, bird_center_x=0.0, bird_center_y=0.0,
+            sharpness=0.0, real_sharpness=0.0, is_dominant=False,
+            is_centered=False, is_sharp=False, class_id=-1
+        )
+    
     def _process_bird_detection(self, image: np.ndarray, detection: np.ndarray,
                                confidence: float, class_id: int, image_path: str,
                                thresholds: ProcessingThresholds, crop_temp_dir: Optional[str],
@@ -209,8 +294,9 @@ class BirdDetector:
         center_x = (x + w / 2) / width
         center_y = (y + h / 2) / height
         
-        # 原始锐度计算（保持兼容性）
-        real_sharpness = self.calculate_sharpness(crop_img)
+        # 原始锐度计算（保持兼容性）；灰度图每个裁剪区域只转换一次
+        crop_gray = cv2.cvtColor(crop_img, cv2.COLOR_BGR2GRAY)
+        real_sharpness = self.calculate_sharpness(crop_img, gray=crop_gray)
         s_area_ratio = round((area_ratio * 1000) ** (1 / 2), 2)
         sharpness = real_sharpness / s_area_ratio if s_area_ratio > 0 else 0
         
@@ -238,17 +324,17 @@ class BirdDetector:
         # 保存裁剪图片
         crop_saved = False
         if crop_temp_dir:
+            filename = os.path.basename(image_path)
+            crop_path = os.path.join(crop_temp_dir, 'Crop_' + filename)
             try:
-                filename = os.path.basename(image_path)
-                crop_path = os.path.join(crop_temp_dir, 'Crop_' + filename)
-                cv2.imwrite(crop_path, crop_img)
+                future = self._io_pool.submit(self._save_crop, crop_path, crop_img, os.path.dirname(image_path))
+            except RuntimeError as e:
+                # 线程池已关闭，无法再提交写盘任务
+                self.file_manager.write_log(f"ERROR saving crop image: {e}", os.path.dirname(image_path))
+            else:
+                with self._pending_lock:
+                    self._pending_crops.append(future)
                 crop_saved = True
-            except Exception as e:
-                work_dir = os.path.dirname(image_path)
-                self.file_manager.write_log(f"ERROR saving crop image: {e}", work_dir)
-        
-        # 在原图上绘制检测框（可选）
-        cv2.rectangle(image, (x, y), (x + w, y + h), (0, 0, 255), 2)
         
         # 记录检测信息
         work_dir = os.path.dirname(image_path)
@@ -286,6 +372,30 @@ class BirdDetector:
             result_new=bird_selected_new
         )
     
+    def _save_crop(self, crop_path: str, crop_img: np.ndarray, work_dir: str) -> None:
+        """在后台线程中按 crop_path 的扩展名编码并写入字节，失败时记录日志"""
+        try:
+            ext = os.path.splitext(crop_path)[1].lower() or '.jpg'
+            params = [cv2.IMWRITE_JPEG_QUALITY, self.CROP_JPEG_QUALITY] if ext in ('.jpg', '.jpeg') else []
+            ok, buf = cv2.imencode(ext, crop_img, params)
+            if not ok:
+                raise ValueError(f"{ext} encode failed")
+            with open(crop_path, 'wb') as f:
+                f.write(buf.tobytes())
+        except Exception as e:
+            self.file_manager.write_log(f"ERROR saving crop image: {e}", work_dir)
+    
+    def flush_crops(self) -> None:
+        """等待所有已提交的裁剪图写盘完成（批处理结束时调用，之后才能读取/清理裁剪目录）"""
+        with self._pending_lock:
+            pending, self._pending_crops = self._pending_crops, []
+        wait(pending)
+    
+    def close(self) -> None:
+        """写完剩余裁剪图并关闭后台写盘线程池"""
+        self.flush_crops()
+        self._io_pool.shutdown(wait=True)
+    
     # ============ 结果转换 ============
     def detection_result_to_csv_data(self, result: DetectionResult, filename: str) -> Dict[str, Any]:
         """将检测结果转换为CSV数据格式 - 完全采用新算法"""
@@ -81,6 +81,10 @@ class ConfigManager:
         """获取图像处理目标尺寸"""
         return self._config.ai.TARGET_IMAGE_SIZE
     
+    def get_use_fp16(self) -> bool:
+        """GPU推理时是否使用半精度（FP16）"""
+        return self._config.ai.USE_FP16
+    
     def get_center_threshold(self) -> float:
         """获取鸟类位置中心阈值"""
         return self._config.ai.CENTER_THRESHOLD
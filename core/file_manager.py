@@ -107,7 +107,28 @@ class FileManager:
         return dir_path
     
     # ============ 文件移动和复制 ============
-    def move_file_group(self, file_prefix: str, source_dir: str, target_dir: str) -> bool:
+    def build_file_group_index(self, directory: str) -> Dict[str, List[str]]:
+        """
+        一次扫描目录，建立 文件前缀 -> 同前缀文件列表 的索引
+        
+        批量移动时用于替代逐个文件调用 _get_related_files（每次都要 listdir 整个目录）
+        """
+        groups: Dict[str, List[str]] = {}
+        
+        if not os.path.exists(directory):
+            return groups
+        
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if not entry.is_file():
+                    continue
+                name, _ = os.path.splitext(entry.name)
+                groups.setdefault(name, []).append(entry.name)
+        
+        return groups
+    
+    def move_file_group(self, file_prefix: str, source_dir: str, target_dir: str,
+                        related_files: Optional[List[str]] = None) -> bool:
         """
         移动同一前缀的所有文件（RAW + JPG）到目标目录
         
@@ -115,11 +136,14 @@ class FileManager:
             file_prefix: 文件前缀（不含扩展名）
             source_dir: 源目录
             target_dir: 目标目录
+            related_files: 预先扫描得到的同前缀文件列表（见 build_file_group_index），
+                           为None时重新扫描源目录
             
         Returns:
             bool: 是否成功移动所有文件
         """
-        related_files = self._get_related_files(file_prefix, source_dir)
+        if related_files is None:
+            related_files = self._get_related_files(file_prefix, source_dir)
         
         if not related_files:
             return False
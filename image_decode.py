@@ -0,0 +1,177 @@
+"""
+图像解码工具
+按比例缩小解码JPEG（TurboJPEG / OpenCV reduced 模式），再缩放到目标尺寸
+
+只依赖 OpenCV、numpy 和配置，供 ai_model 与 core.bird_detector 共用，
+导入时不加载推理相关模块，也不修改 OpenCV 的全局设置
+"""
+
+import cv2
+import numpy as np
+from config import config
+
+# 尝试导入 TurboJPEG（可选，用于DCT域按比例缩小解码）
+try:
+    from turbojpeg import TurboJPEG, TJPF_BGR
+    _turbo_jpeg = TurboJPEG()
+    TURBOJPEG_AVAILABLE = True
+except Exception:
+    # 未安装 PyTurboJPEG 或系统缺少 libjpeg-turbo 动态库
+    TURBOJPEG_AVAILABLE = False
+
+
+def _decode_jpeg_scaled(data, target_size):
+    """
+    使用 TurboJPEG 按比例缩小解码（1/2、1/4、1/8）
+
+    在DCT域直接输出缩小后的像素，选择最大的缩小倍数N，保证长边/N 仍不小于目标尺寸；
+    TurboJPEG 不处理EXIF方向，解码后按 Orientation 标签转正，与 cv2.imread 的结果一致
+    """
+    width, height, _, _ = _turbo_jpeg.decode_header(data)
+    long_side = max(width, height)
+    scaling_factor = None
+    for denominator in (8, 4, 2):
+        if long_side / denominator >= target_size:
+            scaling_factor = (1, denominator)
+            break
+    img = _turbo_jpeg.decode(data, pixel_format=TJPF_BGR, scaling_factor=scaling_factor)
+    return _apply_orientation(img, _jpeg_orientation(data))
+
+
+# OpenCV 按比例缩小解码标志（libjpeg 在DCT域缩小，未安装 TurboJPEG 时使用）
+_CV2_REDUCED_FLAGS = (
+    (8, cv2.IMREAD_REDUCED_COLOR_8),
+    (4, cv2.IMREAD_REDUCED_COLOR_4),
+    (2, cv2.IMREAD_REDUCED_COLOR_2),
+)
+
+
+def _iter_jpeg_segments(data):
+    """逐个产出JPEG段头之前的 (marker, 段起始位置, 段长度)，到扫描数据(SOS)或格式异常时停止"""
+    if data[:2] != b'\xff\xd8':
+        return
+    pos, size = 2, len(data)
+    while pos + 9 < size:
+        if data[pos] != 0xFF:
+            return
+        marker = data[pos + 1]
+        if marker == 0xFF:  # 填充字节
+            pos += 1
+            continue
+        if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7:
+            pos += 2
+            continue
+        if marker == 0xDA:  # 已到扫描数据
+            return
+        length = int.from_bytes(data[pos + 2:pos + 4], 'big')
+        yield marker, pos, length
+        pos += 2 + length
+
+
+def _jpeg_dimensions(data):
+    """从JPEG的SOF段读取 (width, height)，只扫描段头不解码像素；无法识别时返回None"""
+    for marker, pos, _ in _iter_jpeg_segments(data):
+        # SOF0-SOF15（排除 DHT=C4、JPG=C8、DAC=CC）
+        if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+            height = int.from_bytes(data[pos + 5:pos + 7], 'big')
+            width = int.from_bytes(data[pos + 7:pos + 9], 'big')
+            return width, height
+    return None
+
+
+def _jpeg_orientation(data):
+    """从APP1(Exif)段的IFD0读取 Orientation 标签（1-8），没有或无法解析时返回1"""
+    for marker, pos, length in _iter_jpeg_segments(data):
+        if marker != 0xE1 or data[pos + 4:pos + 10] != b'Exif\x00\x00':
+            continue
+        tiff = data[pos + 10:pos + 2 + length]
+        if tiff[:2] == b'II':
+            order = 'little'
+        elif tiff[:2] == b'MM':
+            order = 'big'
+        else:
+            return 1
+        ifd = int.from_bytes(tiff[4:8], order)
+        count = int.from_bytes(tiff[ifd:ifd + 2], order)
+        for i in range(count):
+            entry = ifd + 2 + i * 12
+            if entry + 12 > len(tiff):
+                break
+            if int.from_bytes(tiff[entry:entry + 2], order) == 0x0112:
+                orientation = int.from_bytes(tiff[entry + 8:entry + 10], order)
+                return orientation if 1 <= orientation <= 8 else 1
+        return 1
+    return 1
+
+
+def _apply_orientation(img, orientation):
+    """按EXIF Orientation 旋转/翻转像素，与 cv2.imread/imdecode 的自动转正结果一致"""
+    if orientation == 2:
+        return cv2.flip(img, 1)
+    if orientation == 3:
+        return cv2.rotate(img, cv2.ROTATE_180)
+    if orientation == 4:
+        return cv2.flip(img, 0)
+    if orientation == 5:
+        return cv2.transpose(img)
+    if orientation == 6:
+        return cv2.rotate(img, cv2.ROTATE_90_CLOCKWISE)
+    if orientation == 7:
+        return cv2.flip(cv2.transpose(img), -1)
+    if orientation == 8:
+        return cv2.rotate(img, cv2.ROTATE_90_COUNTERCLOCKWISE)
+    return img
+
+
+def _decode_cv2_scaled(data, target_size):
+    """
+    使用 OpenCV 解码，能读到JPEG尺寸时按 1/2、1/4、1/8 缩小解码
+
+    imdecode 是否按EXIF转正随 OpenCV 版本而异，这里关闭自动转正、统一按 Orientation 标签处理，
+    保证与 TurboJPEG 路径输出同一方向
+    """
+    buf = np.frombuffer(data, dtype=np.uint8)
+    orientation = _jpeg_orientation(data)
+    dims = _jpeg_dimensions(data)
+    img = None
+    if dims is not None:
+        long_side = max(dims)
+        for denominator, flag in _CV2_REDUCED_FLAGS:
+            if long_side / denominator >= target_size:
+                img = cv2.imdecode(buf, flag | cv2.IMREAD_IGNORE_ORIENTATION)
+                break
+    if img is None:
+        img = cv2.imdecode(buf, cv2.IMREAD_COLOR | cv2.IMREAD_IGNORE_ORIENTATION)
+    if img is None:
+        return None
+    return _apply_orientation(img, orientation)
+
+
+def preprocess_image(image_path, target_size=None):
+    """
+    预处理图像（读取一次文件字节，按比例缩小解码后再缩放到目标尺寸）
+
+    两条解码路径都按EXIF Orientation 转正，ai_model 与 BirdDetector 拿到的像素方向
+    与 cv2.imread 一致，检测框、裁剪和锐度掩码坐标不会错位
+    """
+    if target_size is None:
+        target_size = config.ai.TARGET_IMAGE_SIZE
+
+    with open(image_path, 'rb') as f:
+        data = f.read()
+
+    img = None
+    if TURBOJPEG_AVAILABLE:
+        try:
+            img = _decode_jpeg_scaled(data, target_size)
+        except Exception:
+            img = None  # 非标准JPEG等情况，退回OpenCV解码
+    if img is None:
+        img = _decode_cv2_scaled(data, target_size)
+    if img is None:
+        raise ValueError(f"无法解码图片: {image_path}")
+
+    h, w = img.shape[:2]
+    scale = target_size / max(w, h)
+    img = cv2.resize(img, (int(w * scale), int(h * scale)), interpolation=cv2.INTER_AREA)
+    return img
@@ -6,11 +6,11 @@ IQA (Image Quality Assessment) 评分器
 """
 
 import os
+import threading
 import torch
 import pyiqa
-from typing import Tuple, Optional
+from typing import List, Tuple, Optional
 import numpy as np
-from PIL import Image
 
 
 class IQAScorer:
@@ -101,27 +101,46 @@ class IQAScorer:
                 )
         return self._brisque_model
 
-    def calculate_nima(self, image_path: str) -> Optional[float]:
+    def _array_to_tensor(self, image_bgr: np.ndarray) -> torch.Tensor:
+        """
+        将 OpenCV BGR 数组转换为 PyIQA 输入张量 (1, 3, H, W)，数值范围 [0, 1]
+
+        张量留在CPU上，PyIQA 在推理时会移动到指标所在设备
+
+        Args:
+            image_bgr: 已解码的 BGR uint8 图像
+        """
+        image_rgb = np.ascontiguousarray(image_bgr[:, :, ::-1])  # BGR -> RGB
+        tensor = torch.from_numpy(image_rgb).permute(2, 0, 1).unsqueeze(0)
+        return tensor.float().div_(255.0)
+
+    def calculate_nima(self, image_input) -> Optional[float]:
         """
         计算 NIMA 美学评分 (使用全图)
 
         Args:
-            image_path: 图片路径
+            image_input: 图片路径 (str) 或已解码的 BGR numpy 数组（避免重复读取解码）
 
         Returns:
             NIMA 分数 (0-10, 越高越好) 或 None (失败时)
         """
-        if not os.path.exists(image_path):
-            print(f"❌ 图片不存在: {image_path}")
+        if isinstance(image_input, str) and not os.path.exists(image_input):
+            print(f"❌ 图片不存在: {image_input}")
             return None
 
         try:
             # 加载模型
             nima_model = self._load_nima()
 
+            # 处理输入
+            if isinstance(image_input, np.ndarray):
+                nima_input = self._array_to_tensor(image_input)
+            else:
+                nima_input = image_input
+
             # 计算评分
             with torch.no_grad():
-                score = nima_model(image_path)
+                score = nima_model(nima_input)
 
             # 转换为 Python float
             if isinstance(score, torch.Tensor):
@@ -137,6 +156,48 @@ class IQAScorer:
             print(f"❌ NIMA 计算失败: {e}")
             return None
 
+    def calculate_nima_batch(self, images: List[np.ndarray]) -> List[Optional[float]]:
+        """
+        批量计算 NIMA 美学评分 (使用全图)
+
+        尺寸相同的图片拼成一个批次做一次前向推理（同一目录的照片通常尺寸一致），
+        不做填充或缩放，结果与逐张计算一致
+
+        Args:
+            images: 已解码的 BGR numpy 数组列表
+
+        Returns:
+            与 images 一一对应的 NIMA 分数列表 (0-10)，失败的项为 None
+        """
+        scores = [None] * len(images)
+        if not images:
+            return scores
+
+        try:
+            nima_model = self._load_nima()
+        except Exception as e:
+            print(f"❌ NIMA 计算失败: {e}")
+            return scores
+
+        # 按尺寸分组
+        groups = {}
+        for i, image in enumerate(images):
+            groups.setdefault(image.shape, []).append(i)
+
+        for indices in groups.values():
+            try:
+                batch = torch.cat([self._array_to_tensor(images[i]) for i in indices])
+                if self.device.type == 'cuda':
+                    batch = batch.pin_memory()
+                with torch.no_grad():
+                    batch_scores = nima_model(batch)
+                for i, score in zip(indices, batch_scores.reshape(-1).tolist()):
+                    scores[i] = max(0.0, min(10.0, float(score)))  # 限制在 [0, 10]
+            except Exception as e:
+                print(f"❌ NIMA 批量计算失败: {e}")
+
+        return scores
+
     def calculate_brisque(self, image_input) -> Optional[float]:
         """
         计算 BRISQUE 技术质量评分 (使用 crop 图片)
@@ -157,31 +218,19 @@ class IQAScorer:
                 if not os.path.exists(image_input):
                     print(f"❌ 图片不存在: {image_input}")
                     return None
-                input_path = image_input
+                brisque_input = image_input
             elif isinstance(image_input, np.ndarray):
-                # numpy 数组 (crop 图片)
-                # 保存为临时文件
-                import tempfile
-                temp_dir = tempfile.gettempdir()
-                temp_path = os.path.join(temp_dir, "temp_brisque.jpg")
-
-                # 转换 BGR (OpenCV) 到 RGB (PIL)
-                if len(image_input.shape) == 3 and image_input.shape[2] == 3:
-                    image_rgb = image_input[:, :, ::-1]  # BGR -> RGB
-                else:
-                    image_rgb = image_input
-
-                # 保存临时文件
-                pil_img = Image.fromarray(image_rgb.astype(np.uint8))
-                pil_img.save(temp_path, quality=95)
-                input_path = temp_path
+                # numpy 数组 (crop 图片)：直接转为张量，不再写临时JPEG再读回
+                if image_input.ndim == 2:
+                    image_input = np.repeat(image_input[:, :, None], 3, axis=2)
+                brisque_input = self._array_to_tensor(image_input.astype(np.uint8, copy=False))
             else:
                 print(f"❌ 不支持的输入类型: {type(image_input)}")
                 return None
 
             # 计算评分
             with torch.no_grad():
-                score = brisque_model(input_path)
+                score = brisque_model(brisque_input)
 
             # 转换为 Python float
             if isinstance(score, torch.Tensor):
@@ -216,8 +265,9 @@ class IQAScorer:
         return nima_score, brisque_score
 
 
-# 全局单例
+# 全局单例（多个工作线程可能同时首次获取，构造时加锁）
 _iqa_scorer_instance = None
+_iqa_scorer_lock = threading.Lock()
 
 
 def get_iqa_scorer(device='mps') -> IQAScorer:
@@ -232,7 +282,9 @@ def get_iqa_scorer(device='mps') -> IQAScorer:
     """
     global _iqa_scorer_instance
     if _iqa_scorer_instance is None:
-        _iqa_scorer_instance = IQAScorer(device=device)
+        with _iqa_scorer_lock:
+            if _iqa_scorer_instance is None:
+                _iqa_scorer_instance = IQAScorer(device=device)
     return _iqa_scorer_instance
 
 
@@ -9,13 +9,11 @@ import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 import threading
 import os
-import csv
 import subprocess
-from pathlib import Path
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from find_bird_util import reset, raw_to_jpeg
-from ai_model import load_yolo_model, detect_and_draw_birds
-from utils import write_to_csv, log_message
+from ai_model import load_yolo_model, detect_and_draw_birds_batch, BATCH_SIZE
+from utils import log_message, flush_log, flush_csv
 from exiftool_manager import get_exiftool_manager
 from advanced_config import get_advanced_config
 from advanced_settings_dialog import AdvancedSettingsDialog
@@ -122,6 +120,8 @@ class WorkerThread(threading.Thread):
         finally:
             # 确保停止caffeinate（即使出错也要停止）
             self._stop_caffeinate()
+            # 出错中断时也把已缓冲的CSV行写入报告
+            flush_csv()
 
     def process_files(self):
         """处理文件的核心逻辑"""
@@ -142,7 +142,9 @@ class WorkerThread(threading.Thread):
 
         # 扫描文件
         scan_start = time.time()
-        for filename in os.listdir(self.dir_path):
+        with os.scandir(self.dir_path) as entries:
+            filenames = [entry.name for entry in entries if entry.is_file()]
+        for filename in filenames:
             if filename.startswith('.'):
                 continue
 
@@ -200,6 +202,7 @@ class WorkerThread(threading.Thread):
 
         processed_files = set()
         process_bar = 0
+        last_progress = -1
 
         # 获取ExifTool管理器
         exiftool_mgr = get_exiftool_manager()
@@ -216,142 +219,165 @@ class WorkerThread(threading.Thread):
 
         ai_total_start = time.time()
 
-        # 处理每个文件
-        for i, filename in enumerate(files_tbr):
-            if self._stop_event.is_set():
-                break
-
+        # V3.2: AI检测按批提交到线程池（每批一次YOLO推理，GPU推理在ai_model内部串行化），
+        # 评分、EXIF写入和统计仍在本线程按完成顺序逐张处理
+        pending_files = []
+        for filename in files_tbr:
             if filename in processed_files:
                 continue
-            if i < process_bar:
-                continue
-
-            process_bar += 1
             processed_files.add(filename)
+            pending_files.append(filename)
+
+        def detect_batch(batch_files):
+            filepaths = [os.path.join(self.dir_path, filename) for filename in batch_files]
+            return detect_and_draw_birds_batch(filepaths, model, None, self.dir_path, self.ui_settings)
+
+        # 两个批次交替：一批推理时，另一批在预处理或计算锐度/IQA
+        executor = ThreadPoolExecutor(max_workers=2)
+        future_to_batch = {}
+        for start in range(0, len(pending_files), BATCH_SIZE):
+            batch_files = pending_files[start:start + BATCH_SIZE]
+            future_to_batch[executor.submit(detect_batch, batch_files)] = batch_files
+
+        def iter_results():
+            """按批次完成顺序逐张产出 (文件名, 检测结果, 异常)"""
+            for future in as_completed(future_to_batch):
+                batch_files = future_to_batch[future]
+                try:
+                    batch_results = future.result()
+                except Exception as e:
+                    for filename in batch_files:
+                        yield filename, None, e
+                    continue
+                for filename, result in zip(batch_files, batch_results):
+                    yield filename, result, None
 
-            # 更新进度
-            should_update_progress = (
-                process_bar % 5 == 0 or
-                process_bar == total_files or
-                process_bar == 1
-            )
-            if should_update_progress:
-                progress = int((process_bar / total_files) * 100)
-                self.progress_callback(progress)
+        # 高级配置在本批次内保持不变，循环外取一次只读快照
+        config = get_advanced_config().snapshot()
+
+        # 处理每个文件
+        try:
+            for filename, result, error in iter_results():
+                if self._stop_event.is_set():
+                    break
 
-            filepath = os.path.join(self.dir_path, filename)
-            file_prefix, _ = os.path.splitext(filename)
+                process_bar += 1
 
-            self.log_callback(f"[{process_bar}/{total_files}] 处理: {filename}")
+                # 更新进度（仅在整数百分比变化时通知GUI，整个处理过程最多101次）
+                progress = process_bar * 100 // total_files
+                if progress != last_progress:
+                    last_progress = progress
+                    self.progress_callback(progress)
 
-            # 记录单张照片处理开始时间
-            photo_start = time.time()
+                file_prefix, _ = os.path.splitext(filename)
 
-            # 运行AI检测（V3.1: 不再需要preview_callback和work_dir）
-            try:
-                result = detect_and_draw_birds(filepath, model, None, self.dir_path, self.ui_settings)
+                self.log_callback(f"[{process_bar}/{total_files}] 处理: {filename}")
+
+                # 获取AI检测结果（V3.1: 不再需要preview_callback和work_dir）
+                if error is not None:
+                    self.log_callback(f"  ❌ 处理异常: {filename} - {str(error)}", "error")
+                    continue
                 if result is None:
                     self.log_callback(f"  ⚠️  无法处理: {filename} (AI推理失败)", "error")
                     continue
-            except Exception as e:
-                self.log_callback(f"  ❌ 处理异常: {filename} - {str(e)}", "error")
-                continue
-
-            detected, selected, confidence, sharpness, nima, brisque = result
-
-            # 获取RAW文件路径
-            raw_file_path = None
-            if file_prefix in raw_dict:
-                raw_extension = raw_dict[file_prefix]
-                raw_file_path = os.path.join(self.dir_path, file_prefix + raw_extension)
-
-            # 构建IQA评分显示文本
-            iqa_text = ""
-            if nima is not None:
-                iqa_text += f", 美学:{nima:.2f}"
-            if brisque is not None:
-                iqa_text += f", 失真:{brisque:.2f}"
 
-            # V3.1: 新的评分逻辑（带具体原因，使用高级配置）
-            config = get_advanced_config()
-            reject_reason = ""
-            quality_issue = ""
-
-            if not detected:
-                rating_value = -1
-                reject_reason = "完全没鸟"
-            elif selected:
-                rating_value = 3
-            else:
-                # 检查0星的具体原因（使用配置阈值）
-                if confidence < config.min_confidence:
-                    rating_value = 0
-                    quality_issue = f"置信度太低({confidence:.0%}<{config.min_confidence:.0%})"
-                elif brisque is not None and brisque > config.max_brisque:
-                    rating_value = 0
-                    quality_issue = f"失真过高({brisque:.1f}>{config.max_brisque})"
-                elif nima is not None and nima < config.min_nima:
-                    rating_value = 0
-                    quality_issue = f"美学太差({nima:.1f}<{config.min_nima:.1f})"
-                elif sharpness < config.min_sharpness:
-                    rating_value = 0
-                    quality_issue = f"锐度太低({sharpness:.0f}<{config.min_sharpness})"
-                elif sharpness >= self.ui_settings[1] or \
-                     (nima is not None and nima >= self.ui_settings[2]):
-                    rating_value = 2
+                detected, selected, confidence, sharpness, nima, brisque = result
+
+                # 获取RAW文件路径
+                raw_file_path = None
+                if file_prefix in raw_dict:
+                    raw_extension = raw_dict[file_prefix]
+                    raw_file_path = os.path.join(self.dir_path, file_prefix + raw_extension)
+
+                # 构建IQA评分显示文本
+                iqa_text = ""
+                if nima is not None:
+                    iqa_text += f", 美学:{nima:.2f}"
+                if brisque is not None:
+                    iqa_text += f", 失真:{brisque:.2f}"
+
+                # V3.1: 新的评分逻辑（带具体原因，使用高级配置）
+                reject_reason = ""
+                quality_issue = ""
+
+                if not detected:
+                    rating_value = -1
+                    reject_reason = "完全没鸟"
+                elif selected:
+                    rating_value = 3
                 else:
-                    rating_value = 1
-
-            # 设置Lightroom评分（带详细原因）
-            # V3.1: 3星照片暂时不设置pick，等全部处理完成后，根据美学+锐度双排名交集设置
-            if rating_value == 3:
-                rating, pick = 3, 0
-                self.stats['star_3'] += 1
-                self.log_callback(f"  ⭐⭐⭐ 优选照片 (AI:{confidence:.2f}, 锐度:{sharpness:.1f}{iqa_text})", "success")
-            elif rating_value == 2:
-                rating, pick = 2, 0
-                self.stats['star_2'] += 1
-                self.log_callback(f"  ⭐⭐ 良好照片 (AI:{confidence:.2f}, 锐度:{sharpness:.1f}{iqa_text})", "info")
-            elif rating_value == 1:
-                rating, pick = 1, 0
-                self.stats['star_1'] += 1
-                self.log_callback(f"  ⭐ 普通照片 (AI:{confidence:.2f}, 锐度:{sharpness:.1f}{iqa_text})", "warning")
-            elif rating_value == 0:
-                rating, pick = 0, 0
-                self.stats['star_0'] += 1
-                self.log_callback(f"  0星 - {quality_issue} (AI:{confidence:.2f}, 锐度:{sharpness:.1f}{iqa_text})", "warning")
-            else:  # -1
-                rating, pick = -1, -1
-                self.stats['no_bird'] += 1
-                self.log_callback(f"  ❌ 已拒绝 - {reject_reason}", "error")
-
-            self.stats['total'] += 1
-
-            # V3.1: 单张即时写入EXIF元数据
-            if raw_file_path and os.path.exists(raw_file_path):
-                exif_start = time.time()
-                single_batch = [{
-                    'file': raw_file_path,
-                    'rating': rating,
-                    'pick': pick,
-                    'sharpness': sharpness,
-                    'nima_score': nima,
-                    'brisque_score': brisque
-                }]
-                batch_stats = exiftool_mgr.batch_set_metadata(single_batch)
-                exif_time = (time.time() - exif_start) * 1000
-
-                if batch_stats['failed'] > 0:
-                    self.log_callback(f"  ⚠️  EXIF写入失败")
-                # 不显示成功日志，避免刷屏
-
-                # V3.1: 收集3星照片信息（用于后续计算精选旗标）
-                if rating_value == 3 and nima is not None:
-                    star_3_photos.append({
+                    # 检查0星的具体原因（使用配置阈值）
+                    if confidence < config.min_confidence:
+                        rating_value = 0
+                        quality_issue = f"置信度太低({confidence:.0%}<{config.min_confidence:.0%})"
+                    elif brisque is not None and brisque > config.max_brisque:
+                        rating_value = 0
+                        quality_issue = f"失真过高({brisque:.1f}>{config.max_brisque})"
+                    elif nima is not None and nima < config.min_nima:
+                        rating_value = 0
+                        quality_issue = f"美学太差({nima:.1f}<{config.min_nima:.1f})"
+                    elif sharpness < config.min_sharpness:
+                        rating_value = 0
+                        quality_issue = f"锐度太低({sharpness:.0f}<{config.min_sharpness})"
+                    elif sharpness >= self.ui_settings[1] or \
+                         (nima is not None and nima >= self.ui_settings[2]):
+                        rating_value = 2
+                    else:
+                        rating_value = 1
+
+                # 设置Lightroom评分（带详细原因）
+                # V3.1: 3星照片暂时不设置pick，等全部处理完成后，根据美学+锐度双排名交集设置
+                if rating_value == 3:
+                    rating, pick = 3, 0
+                    self.stats['star_3'] += 1
+                    self.log_callback(f"  ⭐⭐⭐ 优选照片 (AI:{confidence:.2f}, 锐度:{sharpness:.1f}{iqa_text})", "success")
+                elif rating_value == 2:
+                    rating, pick = 2, 0
+                    self.stats['star_2'] += 1
+                    self.log_callback(f"  ⭐⭐ 良好照片 (AI:{confidence:.2f}, 锐度:{sharpness:.1f}{iqa_text})", "info")
+                elif rating_value == 1:
+                    rating, pick = 1, 0
+                    self.stats['star_1'] += 1
+                    self.log_callback(f"  ⭐ 普通照片 (AI:{confidence:.2f}, 锐度:{sharpness:.1f}{iqa_text})", "warning")
+                elif rating_value == 0:
+                    rating, pick = 0, 0
+                    self.stats['star_0'] += 1
+                    self.log_callback(f"  0星 - {quality_issue} (AI:{confidence:.2f}, 锐度:{sharpness:.1f}{iqa_text})", "warning")
+                else:  # -1
+                    rating, pick = -1, -1
+                    self.stats['no_bird'] += 1
+                    self.log_callback(f"  ❌ 已拒绝 - {reject_reason}", "error")
+
+                self.stats['total'] += 1
+
+                # V3.1: 单张即时写入EXIF元数据（RAW路径来自目录扫描，无需再次检查是否存在）
+                if raw_file_path:
+                    exif_start = time.time()
+                    single_batch = [{
                         'file': raw_file_path,
-                        'nima': nima,
-                        'sharpness': sharpness
-                    })
+                        'rating': rating,
+                        'pick': pick,
+                        'sharpness': sharpness,
+                        'nima_score': nima,
+                        'brisque_score': brisque
+                    }]
+                    batch_stats = exiftool_mgr.batch_set_metadata(single_batch)
+                    exif_time = (time.time() - exif_start) * 1000
+
+                    if batch_stats['failed'] > 0:
+                        self.log_callback(f"  ⚠️  EXIF写入失败")
+                    # 不显示成功日志，避免刷屏
+
+                    # V3.1: 收集3星照片信息（用于后续计算精选旗标）
+                    if rating_value == 3 and nima is not None:
+                        star_3_photos.append({
+                            'file': raw_file_path,
+                            'nima': nima,
+                            'sharpness': sharpness
+                        })
+        finally:
+            # 停止时取消尚未开始的检测任务
+            executor.shutdown(wait=True, cancel_futures=True)
 
         # V3.1: 计算精选旗标（3星照片中美学+锐度双排名交集）
         if len(star_3_photos) > 0:
@@ -408,6 +434,10 @@ class WorkerThread(threading.Thread):
             picked_total_time = (time.time() - picked_start) * 1000
             self.log_callback(f"  ⏱️  精选旗标计算总耗时: {picked_total_time:.1f}ms")
 
+        # 写出缓冲的处理日志和CSV报告
+        flush_log()
+        flush_csv(sync=True)
+
         # AI检测总耗时
         ai_total_time_sec = time.time() - ai_total_start
         avg_ai_time_sec = ai_total_time_sec / total_files if total_files > 0 else 0
@@ -3,6 +3,8 @@
 协调核心层组件，提供高级业务逻辑
 """
 import os
+import queue
+import threading
 from typing import List, Dict, Any, Optional, Tuple, Callable
 from dataclasses import dataclass
 from enum import Enum
@@ -67,6 +69,9 @@ class ImageProcessingService:
         # 临时文件跟踪 - 记录每个文件是否为临时生成
         self._temp_jpg_files: Dict[str, str] = {}  # filename -> full_path 映射
         
+        # 同前缀文件索引（RAW转换后扫描一次，移动文件时复用）
+        self._file_groups: Dict[str, List[str]] = {}
+        
     # ============ 服务配置 ============
     def set_progress_callback(self, callback: Callable[[ProcessingProgress], None]) -> None:
         """设置进度回调函数"""
@@ -109,7 +114,8 @@ class ImageProcessingService:
                 directory_path, raw_dict, jpg_dict, files_to_process
             )
             
-            # 5. 处理所有图像文件
+            # 5. 处理所有图像文件（移动文件组时复用一次性扫描的索引）
+            self._file_groups = self.file_manager.build_file_group_index(directory_path)
             stats = self._process_all_images(
                 directory_path, files_to_process, thresholds
             )
@@ -239,58 +245,95 @@ class ImageProcessingService:
         
         processed_files = set()
         
-        for index, filename in enumerate(files_to_process):
-            # 报告进度
-            progress = ProcessingProgress(
-                current_file=filename,
-                current_index=index + 1,
-                total_files=total_files,
-                status=ProcessingStatus.PROCESSING,
-                message=f"Processing {filename}",
-                stats=stats
-            )
-            self._report_progress(progress)
-            
-            # 跳过重复文件
-            if filename in processed_files:
-                self.file_manager.write_log(f"Skipping {filename}, already processed", directory_path)
-                continue
-            
-            # 处理单个文件
-            result = self._process_single_image(directory_path, filename, thresholds)
-            
-            if result is not None:
-                # 保存检测结果到CSV
-                csv_data = self.bird_detector.detection_result_to_csv_data(result, filename)
-                self.file_manager.write_csv_row(csv_data, directory_path)
+        # 文件移动交给后台线程，检测线程无需等待磁盘I/O即可处理下一张
+        stats_lock = threading.Lock()
+        move_queue: "queue.Queue[Optional[Tuple[str, DetectionResult]]]" = queue.Queue()
+        mover_thread = threading.Thread(
+            target=self._file_mover,
+            args=(move_queue, directory_path, stats, stats_lock),
+            daemon=True
+        )
+        mover_thread.start()
+        
+        try:
+            for index, filename in enumerate(files_to_process):
+                # 报告进度
+                progress = ProcessingProgress(
+                    current_file=filename,
+                    current_index=index + 1,
+                    total_files=total_files,
+                    status=ProcessingStatus.PROCESSING,
+                    message=f"Processing {filename}",
+                    stats=stats
+                )
+                self._report_progress(progress)
                 
-                # 移动文件到相应目录
-                target_dir = self._determine_target_directory(result)
-                file_prefix = os.path.splitext(filename)[0]
+                # 跳过重复文件
+                if filename in processed_files:
+                    self.file_manager.write_log(f"Skipping {filename}, already processed", directory_path)
+                    continue
                 
-                if self.file_manager.move_file_group(file_prefix, directory_path, target_dir):
-                    # 更新统计
-                    if result.bird_selected:
-                        stats.excellent_count += 1
-                    elif result.found_bird:
-                        stats.standard_count += 1
-                    else:
-                        stats.no_birds_count += 1
-                else:
-                    stats.error_count += 1
-                    
-                stats.processed_files += 1
-                processed_files.add(filename)
+                # 处理单个文件
+                result = self._process_single_image(directory_path, filename, thresholds)
                 
-                # 立即删除临时JPG文件（如果这是临时生成的）
-                self._cleanup_temp_jpg_immediately(filename, directory_path)
-            else:
-                stats.error_count += 1
-                # 处理失败也要清理临时文件
-                self._cleanup_temp_jpg_immediately(filename, directory_path)
+                if result is not None:
+                    # 保存检测结果到CSV
+                    csv_data = self.bird_detector.detection_result_to_csv_data(result, filename)
+                    self.file_manager.write_csv_row(csv_data, directory_path)
+                    
+                    # 移动文件到相应目录（后台线程执行，临时JPG在移动后清理）
+                    move_queue.put((filename, result))
+                    
+                    stats.processed_files += 1
+                    processed_files.add(filename)
+                else:
+                    with stats_lock:
+                        stats.error_count += 1
+                    # 处理失败也要清理临时文件
+                    self._cleanup_temp_jpg_immediately(filename, directory_path)
+        finally:
+            # 等待所有移动操作完成
+            move_queue.put(None)
+            mover_thread.join()
+            # 等待后台裁剪图写盘完成，保证返回时裁剪文件都已落盘
+            self.bird_detector.flush_crops()
         
         return stats
     
+    def _file_mover(self, move_queue: "queue.Queue[Optional[Tuple[str, DetectionResult]]]",
+                    directory_path: str, stats: ProcessingStats,
+                    stats_lock: threading.Lock) -> None:
+        """后台移动线程：按提交顺序移动文件组并更新统计，收到None时退出"""
+        while True:
+            item = move_queue.get()
+            if item is None:
+                return
+            
+            filename, result = item
+            try:
+                target_dir = self._determine_target_directory(result)
+                file_prefix = os.path.splitext(filename)[0]
+                related_files = self._file_groups.get(file_prefix)
+                moved = self.file_manager.move_file_group(file_prefix, directory_path, target_dir,
+                                                          related_files)
+            except Exception as e:
+                self.file_manager.write_log(f"ERROR moving {filename}: {e}", directory_path)
+                moved = False
+            
+            # 更新统计
+            with stats_lock:
+                if not moved:
+                    stats.error_count += 1
+                elif result.bird_selected:
+                    stats.excellent_count += 1
+                elif result.found_bird:
+                    stats.standard_count += 1
+                else:
+                    stats.no_birds_count += 1
+            
+            # 立即删除临时JPG文件（如果这是临时生成的）
+            self._cleanup_temp_jpg_immediately(filename, directory_path)
+    
     def _process_single_image(self, directory_path: str, filename: str,
                              thresholds: ProcessingThresholds) -> Optional[DetectionResult]:
         """处理单个图像文件"""
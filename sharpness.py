@@ -4,10 +4,45 @@
 消除背景噪声干扰，实现大小鸟之间的公平比较
 """
 
+import threading
 import cv2
 import numpy as np
 from typing import Dict, Optional, Tuple
 
+# 尝试导入 numba（可选，用于单次遍历计算掩码区域的拉普拉斯方差）
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+
+if NUMBA_AVAILABLE:
+    # 串行内核：多个裁剪区域已经在后处理线程池中并行计算，这里再用 parallel=True
+    # 会在多个线程同时启动并行内核，numba 默认的 workqueue 线程层会直接终止进程
+    @njit(cache=True, fastmath=True)
+    def _masked_moments(values, mask):
+        """单次遍历统计掩码(>0.5)区域的像素数、和、平方和，不生成中间数组"""
+        count = 0
+        total = 0.0
+        total_sq = 0.0
+        for y in range(values.shape[0]):
+            for x in range(values.shape[1]):
+                if mask[y, x] > 0.5:
+                    v = values[y, x]
+                    count += 1
+                    total += v
+                    total_sq += v * v
+        return count, total, total_sq
+
+    # 预热：按实际使用的掩码类型各编译一次（float32 来自YOLO掩码，uint8 为全1掩码）
+    # 编译或写缓存失败（如只读的打包应用）时退回 numpy 路径，不影响模块导入
+    try:
+        _masked_moments(np.zeros((8, 8)), np.ones((8, 8), dtype=np.float32))
+        _masked_moments(np.zeros((8, 8)), np.ones((8, 8), dtype=np.uint8))
+    except Exception:
+        NUMBA_AVAILABLE = False
+
 
 class MaskBasedSharpnessCalculator:
     """基于掩码的锐度计算器"""
@@ -30,6 +65,19 @@ class MaskBasedSharpnessCalculator:
         """
         self.method = method
         self.normalization = normalization
+        # 拉普拉斯结果缓冲区：按线程保存，只在遇到更大的裁剪图时才重新分配
+        self._local = threading.local()
+
+    def _laplacian(self, gray: np.ndarray) -> np.ndarray:
+        """计算拉普拉斯响应，写入复用的缓冲区（返回的数组在下次调用前有效）"""
+        size = gray.shape[0] * gray.shape[1]
+        scratch = getattr(self._local, 'scratch', None)
+        if scratch is None or scratch.size < size:
+            scratch = np.empty(size, dtype=np.float64)
+            self._local.scratch = scratch
+        dst = scratch[:size].reshape(gray.shape[:2])
+        cv2.Laplacian(gray, cv2.CV_64F, dst=dst, ksize=3)
+        return dst
 
     def calculate(self, image: np.ndarray, mask: np.ndarray) -> Dict[str, float]:
         """
@@ -61,29 +109,41 @@ class MaskBasedSharpnessCalculator:
             mask = cv2.resize(mask, (gray.shape[1], gray.shape[0]),
                             interpolation=cv2.INTER_NEAREST)
 
-        # 3. 二值化掩码
-        mask_binary = (mask > 0.5).astype(bool)
-
-        # 4. 计算拉普拉斯响应
-        laplacian = cv2.Laplacian(gray, cv2.CV_64F, ksize=3)
-
-        # 5. 仅提取掩码区域的拉普拉斯值
-        laplacian_masked = laplacian[mask_binary]
+        # 3. 计算拉普拉斯响应
+        laplacian = self._laplacian(gray)
+        total_pixels = gray.shape[0] * gray.shape[1]
 
-        # 6. 计算总锐度
-        if len(laplacian_masked) > 0:
-            if self.method == 'variance':
-                total_sharpness = np.var(laplacian_masked)
-            elif self.method == 'L2':
-                total_sharpness = np.linalg.norm(laplacian_masked)
+        if NUMBA_AVAILABLE and mask.ndim == 2:
+            # 4-6. 单次遍历掩码区域求方差/L2范数（不生成布尔掩码和掩码区域副本）
+            effective_pixels, total, total_sq = _masked_moments(laplacian, mask)
+            if effective_pixels > 0:
+                if self.method == 'L2':
+                    total_sharpness = np.sqrt(total_sq)
+                else:
+                    mean = total / effective_pixels
+                    total_sharpness = max(total_sq / effective_pixels - mean * mean, 0.0)
             else:
-                total_sharpness = np.var(laplacian_masked)  # 默认使用方差
+                total_sharpness = 0.0
         else:
-            total_sharpness = 0.0
+            # 4. 二值化掩码
+            mask_binary = (mask > 0.5).astype(bool)
+
+            # 5. 仅提取掩码区域的拉普拉斯值
+            laplacian_masked = laplacian[mask_binary]
+
+            # 6. 计算总锐度
+            if len(laplacian_masked) > 0:
+                if self.method == 'variance':
+                    total_sharpness = np.var(laplacian_masked)
+                elif self.method == 'L2':
+                    total_sharpness = np.linalg.norm(laplacian_masked)
+                else:
+                    total_sharpness = np.var(laplacian_masked)  # 默认使用方差
+            else:
+                total_sharpness = 0.0
+            effective_pixels = np.sum(mask_binary)
 
         # 7. 计算面积信息
-        effective_pixels = np.sum(mask_binary)
-        total_pixels = gray.shape[0] * gray.shape[1]
         area_ratio = effective_pixels / total_pixels if total_pixels > 0 else 0.0
 
         # 8. 归一化锐度
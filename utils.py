@@ -4,8 +4,17 @@
 """
 import os
 import csv
+import atexit
+import threading
 from datetime import datetime
 
+# 日志/CSV文件写入锁（AI检测在线程池中并行执行，防止多线程交错写入同一文件）
+_file_lock = threading.Lock()
+
+# 日志缓冲：每个日志文件攒够一定行数后一次性追加写入，避免每条日志都打开/关闭文件
+LOG_FLUSH_LINES = 64
+_log_buffers = {}  # log_file -> [line, ...]
+
 
 def log_message(message: str, directory: str = None):
     """
@@ -18,27 +27,61 @@ def log_message(message: str, directory: str = None):
     # 打印到控制台
     print(message)
 
-    # 如果提供了目录，写入日志文件到_tmp子目录
+    # 如果提供了目录，写入日志文件到_tmp子目录（先缓冲，满 LOG_FLUSH_LINES 行再落盘）
     if directory:
+        log_file = os.path.join(directory, "_tmp", "process_log.txt")
+        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        with _file_lock:
+            buffer = _log_buffers.setdefault(log_file, [])
+            buffer.append(f"[{timestamp}] {message}\n")
+            if len(buffer) >= LOG_FLUSH_LINES:
+                _flush_log_buffer(log_file)
+
+
+def _flush_log_buffer(log_file: str):
+    """将缓冲的日志写入文件（调用方需持有 _file_lock）"""
+    buffer = _log_buffers.get(log_file)
+    if not buffer:
+        return
+    try:
         # 确保_tmp目录存在
-        tmp_dir = os.path.join(directory, "_tmp")
-        os.makedirs(tmp_dir, exist_ok=True)
+        os.makedirs(os.path.dirname(log_file), exist_ok=True)
+        with open(log_file, 'a', encoding='utf-8') as f:
+            f.write(''.join(buffer))
+    except Exception as e:
+        print(f"Warning: Could not write to log file: {e}")
+    buffer.clear()
+
 
-        log_file = os.path.join(tmp_dir, "process_log.txt")
-        try:
-            with open(log_file, 'a', encoding='utf-8') as f:
-                timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                f.write(f"[{timestamp}] {message}\n")
-        except Exception as e:
-            print(f"Warning: Could not write to log file: {e}")
+def flush_log():
+    """将所有缓冲的日志写入文件（处理结束时调用，进程退出时也会自动调用）"""
+    with _file_lock:
+        for log_file in list(_log_buffers):
+            _flush_log_buffer(log_file)
 
 
-def write_to_csv(data: dict, directory: str, header: bool = False):
+atexit.register(flush_log)
+
+
+# CSV报告列顺序（write_to_csv 接受按此顺序排列的行元组，或以列名为键的字典）
+REPORT_FIELDNAMES = (
+    "文件名", "是否有鸟", "置信度", "X坐标", "Y坐标",
+    "鸟占比", "像素数", "原始锐度", "归一化锐度", "NIMA美学", "BRISQUE技术", "星等", "评分",
+    "面积达标", "居中", "锐度达标", "类别ID"
+)
+
+# CSV缓冲：与日志相同，攒够一定行数后一次性追加写入
+CSV_FLUSH_ROWS = 64
+_csv_buffers = {}  # report_file -> [row, ...]
+
+
+def write_to_csv(data, directory: str, header: bool = False):
     """
-    将数据写入CSV报告文件
+    将数据写入CSV报告文件（行先缓冲，满 CSV_FLUSH_ROWS 行再落盘）
 
     Args:
-        data: 要写入的数据字典（如果为None且header=True，则只创建文件并写表头）
+        data: 一行数据，按 REPORT_FIELDNAMES 顺序的元组，或以列名为键的字典
+              （如果为None且header=True，则只创建文件并写表头）
         directory: 工作目录
         header: 是否写入表头（第一次写入时为True）
     """
@@ -48,32 +91,60 @@ def write_to_csv(data: dict, directory: str, header: bool = False):
 
     report_file = os.path.join(tmp_dir, "report.csv")
 
-    # 定义CSV列顺序
-    fieldnames = [
-        "文件名", "是否有鸟", "置信度", "X坐标", "Y坐标",
-        "鸟占比", "像素数", "原始锐度", "归一化锐度", "NIMA美学", "BRISQUE技术", "星等", "评分",
-        "面积达标", "居中", "锐度达标", "类别ID"
-    ]
+    if isinstance(data, dict):
+        data = tuple(data.get(name, "") for name in REPORT_FIELDNAMES)
 
     try:
-        # 如果是初始化表头（data为None）
-        if data is None and header:
-            with open(report_file, 'w', newline='', encoding='utf-8-sig') as f:
-                writer = csv.DictWriter(f, fieldnames=fieldnames)
-                writer.writeheader()
-            return
+        with _file_lock:
+            if header:
+                # 重新开始一份报告：丢弃旧缓冲，立即写表头
+                _csv_buffers.pop(report_file, None)
+                with open(report_file, 'w', newline='', encoding='utf-8-sig') as f:
+                    writer = csv.writer(f)
+                    writer.writerow(REPORT_FIELDNAMES)
+                    if data:
+                        writer.writerow(data)
+                return
 
+            if data:
+                buffer = _csv_buffers.setdefault(report_file, [])
+                buffer.append(data)
+                if len(buffer) >= CSV_FLUSH_ROWS:
+                    _flush_csv_buffer(report_file)
+    except Exception as e:
+        log_message(f"Warning: Could not write to CSV file: {e}", directory)
+
+
+def _flush_csv_buffer(report_file: str, sync: bool = False):
+    """将缓冲的CSV行写入文件，文件不存在时先写表头（调用方需持有 _file_lock）"""
+    buffer = _csv_buffers.get(report_file)
+    if not buffer:
+        return
+    try:
         file_exists = os.path.exists(report_file)
-        mode = 'a' if file_exists else 'w'
+        with open(report_file, 'a' if file_exists else 'w', newline='', encoding='utf-8-sig') as f:
+            writer = csv.writer(f)
+            if not file_exists:
+                writer.writerow(REPORT_FIELDNAMES)
+            writer.writerows(buffer)
+            if sync:
+                f.flush()
+                os.fsync(f.fileno())
+    except Exception as e:
+        print(f"Warning: Could not write to CSV file: {e}")
+    buffer.clear()
 
-        with open(report_file, mode, newline='', encoding='utf-8-sig') as f:
-            writer = csv.DictWriter(f, fieldnames=fieldnames)
 
-            # 如果文件不存在或者明确要求写表头，则写入表头
-            if not file_exists or header:
-                writer.writeheader()
+def flush_csv(sync: bool = False):
+    """
+    将所有缓冲的CSV行写入文件（处理结束时调用，进程退出时也会自动调用）
 
-            if data:
-                writer.writerow(data)
-    except Exception as e:
-        log_message(f"Warning: Could not write to CSV file: {e}", directory)
+    Args:
+        sync: 是否 fsync 落盘（只在一次处理的最后调用时使用，中途批量写入不做fsync）
+    """
+    with _file_lock:
+        for report_file in list(_csv_buffers):
+            _flush_csv_buffer(report_file, sync)
+
+
+atexit.register(flush_csv)